@@ -9,6 +9,7 @@ from datetime import datetime
 import shutil
 import subprocess
 import threading
+import uuid
 
 from core.models.database import get_session, Checkpoint, Invoice, init_db
 from core.utils.logging_config import get_logger
@@ -390,6 +391,9 @@ async def process_invoice(file: UploadFile = File(...)):
         
         # Start workflow in background
         def run_workflow():
+            # invoice_id is still None at this point (INGEST assigns it), so
+            # each run gets its own checkpoint thread in the shared checkpointer
+            thread_id = str(uuid.uuid4())
             try:
                 # Import workflow components
                 from app.workflow.invoice_workflow import get_compiled_workflow
@@ -402,9 +406,6 @@ async def process_invoice(file: UploadFile = File(...)):
                     file_type=file_path.suffix.lstrip('.')
                 )
                 
-                invoice_id = initial_state['invoice_id']
-                thread_id = invoice_id
-                
                 # Get compiled workflow
                 workflow = get_compiled_workflow()
                 config = {"configurable": {"thread_id": thread_id}}
@@ -440,6 +441,9 @@ async def process_invoice(file: UploadFile = File(...)):
                 logger.error(f"Workflow error: {e}", exc_info=True)
                 active_workflows[workflow_id]["status"] = "FAILED"
                 active_workflows[workflow_id]["error"] = str(e)
+            finally:
+                from app.workflow.invoice_workflow import release_workflow_thread
+                release_workflow_thread(thread_id)
 
         
         thread = threading.Thread(target=run_workflow, daemon=True)
@@ -5,6 +5,7 @@ from typing import Dict, Any
 from datetime import datetime
 
 from app.nodes.base_node import DeterministicNode
+from app.nodes.validate_node import clear_duplicate_cache
 from core.models.state import InvoiceState
 from core.models.database import get_session, Invoice, AuditLog
 from core.utils.helpers import calculate_hash
@@ -227,6 +228,8 @@ class CompleteNode(DeterministicNode):
             session.add(audit_log)
             
             session.commit()
+            # Invoice rows changed, so cached duplicate lookups may be stale
+            clear_duplicate_cache()
             logger.info(f"Saved invoice and audit log to database: {invoice_id}")
             
         except Exception as e:
@@ -83,7 +83,7 @@ class EnrichNode(DeterministicNode):
         
         return state
     
-    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0))
+    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0), failure_class='enrichment')
     def _enrich_vendor(
         self,
         vendor_name: str,
@@ -85,7 +85,7 @@ class ExtractNode(DeterministicNode):
         
         return state
     
-    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0))
+    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0), failure_class='ocr')
     def _perform_ocr(self, file_path: str, selected_tool: str, tool_info: Dict[str, Any]) -> tuple[str, float]:
         """
         Perform OCR extraction using the LLM-selected tool
@@ -1,11 +1,10 @@
 """
 MATCH_TWO_WAY Node - Perform 2-way matching between invoice and PO
 """
-from typing import Dict, Any, List
+from typing import Dict, Any
 from core.config.config import config
 from app.nodes.base_node import DeterministicNode
 from core.models.state import InvoiceState
-from core.utils.helpers import is_within_tolerance
 from core.utils.logging_config import get_logger
 from integrations.mcp.common_mcp_client import common_mcp_client
 
@@ -28,6 +27,8 @@ class MatchTwoWayNode(DeterministicNode):
         super().__init__(name="MATCH_TWO_WAY")
         self.match_threshold = config.MATCH_THRESHOLD
         self.tolerance_pct = config.TOLERANCE_PERCENTAGE
+        # Scores at or above this ceiling cannot be beaten, so stop scoring further POs
+        self.perfect_score = 0.999
     
     def execute(self, state: InvoiceState) -> InvoiceState:
         """
@@ -55,6 +56,13 @@ class MatchTwoWayNode(DeterministicNode):
             state['status'] = 'MATCH_FAILED'
             return state
         
+        # Score the PO closest in amount first so the perfect-match break triggers sooner
+        invoice_total = extracted_data.get('total_amount', 0)
+        matched_pos = sorted(
+            matched_pos,
+            key=lambda po: abs(po.get('total_amount', 0) - invoice_total)
+        )
+        
         # Perform matching with best PO
         best_match = None
         best_score = 0.0
@@ -66,6 +74,10 @@ class MatchTwoWayNode(DeterministicNode):
                 best_score = score
                 best_match = po
                 best_evidence = evidence
+            
+            if best_score >= self.perfect_score:
+                logger.info(f"Perfect match found with PO {po['po_number']} - skipping remaining POs")
+                break
         
         # Determine match result
         if best_score >= self.match_threshold:
@@ -127,121 +139,6 @@ class MatchTwoWayNode(DeterministicNode):
         )
         
         return match_score, evidence
-    
-    def _match_vendor(self, invoice_data: Dict[str, Any], po: Dict[str, Any]) -> bool:
-        """Check if vendor matches"""
-        # In production, would compare vendor IDs
-        # For now, assume vendor matches if PO was retrieved for this vendor
-        return True
-    
-    def _match_amount(self, invoice_data: Dict[str, Any], po: Dict[str, Any]) -> tuple[float, float]:
-        """
-        Match invoice amount with PO amount
-        
-        Returns:
-            Tuple of (score, difference)
-        """
-        invoice_amount = invoice_data.get('total_amount', 0)
-        po_amount = po.get('total_amount', 0)
-        
-        diff = invoice_amount - po_amount
-        
-        # Check if within tolerance
-        if is_within_tolerance(invoice_amount, po_amount, self.tolerance_pct):
-            return 1.0, diff
-        else:
-            # Partial score based on how far off
-            diff_pct = abs(diff) / po_amount * 100 if po_amount > 0 else 100
-            if diff_pct <= self.tolerance_pct * 2:  # Within 2x tolerance
-                return 0.5, diff
-            else:
-                return 0.0, diff
-    
-    def _match_line_items(
-        self,
-        invoice_data: Dict[str, Any],
-        po: Dict[str, Any]
-    ) -> tuple[float, int, int]:
-        """
-        Match invoice line items with PO line items
-        
-        Returns:
-            Tuple of (score, matched_count, total_count)
-        """
-        invoice_items = invoice_data.get('line_items', [])
-        po_items = po.get('line_items', [])
-        
-        if not invoice_items or not po_items:
-            return 0.0, 0, max(len(invoice_items), len(po_items))
-        
-        matched_count = 0
-        total_items = len(invoice_items)
-        
-        # Try to match each invoice item with PO items
-        for inv_item in invoice_items:
-            inv_desc = inv_item.get('description', '').lower()
-            inv_qty = inv_item.get('quantity', 0)
-            inv_price = inv_item.get('unit_price', 0)
-            
-            for po_item in po_items:
-                po_desc = po_item.get('description', '').lower()
-                po_qty = po_item.get('quantity', 0)
-                po_price = po_item.get('unit_price', 0)
-                
-                # Check if descriptions match (fuzzy)
-                desc_match = inv_desc in po_desc or po_desc in inv_desc
-                
-                # Check if quantities match (exact or within tolerance)
-                qty_match = inv_qty == po_qty or is_within_tolerance(inv_qty, po_qty, 5.0)
-                
-                # Check if prices match (within tolerance)
-                price_match = is_within_tolerance(inv_price, po_price, self.tolerance_pct)
-                
-                if desc_match and qty_match and price_match:
-                    matched_count += 1
-                    break
-        
-        # Calculate score
-        match_ratio = matched_count / total_items if total_items > 0 else 0
-        
-        return match_ratio, matched_count, total_items
-    
-    def _match_dates(self, invoice_data: Dict[str, Any], po: Dict[str, Any]) -> float:
-        """
-        Check date proximity between invoice and PO
-        
-        Returns:
-            Score based on date proximity
-        """
-        from core.utils.helpers import parse_date
-        
-        invoice_date_str = invoice_data.get('invoice_date')
-        po_date_str = po.get('po_date')
-        
-        if not invoice_date_str or not po_date_str:
-            return 0.5  # Neutral score if dates missing
-        
-        invoice_date = parse_date(invoice_date_str)
-        po_date = parse_date(po_date_str)
-        
-        if not invoice_date or not po_date:
-            return 0.5
-        
-        # Invoice should be after PO
-        if invoice_date < po_date:
-            return 0.0
-        
-        # Check days difference
-        days_diff = (invoice_date - po_date).days
-        
-        if days_diff <= 30:  # Within 30 days
-            return 1.0
-        elif days_diff <= 60:  # Within 60 days
-            return 0.7
-        elif days_diff <= 90:  # Within 90 days
-            return 0.5
-        else:
-            return 0.3
 
 
 # Create node instance
@@ -2,9 +2,10 @@
 NOTIFY Node - Send email notifications about invoice processing
 """
 from typing import Dict, Any, List
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.nodes.base_node import DeterministicNode
+from core.config.config import config
 from core.models.state import InvoiceState
 from integrations.tools.bigtool_picker import bigtool_picker
 from core.utils.error_handler import with_retry, RetryPolicy
@@ -15,6 +16,17 @@ from integrations.mcp.atlas_mcp_client import get_atlas_client
 logger = get_logger(__name__)
 
 
+# Workflow status -> (notification type, subject, priority)
+NOTIFICATION_CONFIGS = {
+    'POSTED': ('SUCCESS', 'Invoice Processed Successfully', 'NORMAL'),
+    'PENDING_REVIEW': ('REVIEW_NEEDED', 'Invoice Requires Human Review', 'HIGH'),
+    'PENDING_APPROVAL': ('APPROVAL_NEEDED', 'Invoice Requires Approval', 'HIGH'),
+    'APPROVAL_REJECTED': ('REJECTED', 'Invoice Processing Failed', 'HIGH'),
+    'MANUAL_HANDOFF': ('REJECTED', 'Invoice Processing Failed', 'HIGH'),
+}
+DEFAULT_NOTIFICATION_CONFIG = ('INFO', 'Invoice Processing Update', 'NORMAL')
+
+
 class NotifyNode(DeterministicNode):
     """
     NOTIFY node: Send email notifications about invoice processing status
@@ -31,6 +43,18 @@ class NotifyNode(DeterministicNode):
             name="NOTIFY",
             retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0)
         )
+        self._atlas = None
+    
+    def _atlas_client(self):
+        """
+        Get the ATLAS MCP client, resolved on first use
+        
+        Resolved lazily so a failure to create the client is handled by the
+        fallback in _send_notifications.
+        """
+        if self._atlas is None:
+            self._atlas = get_atlas_client()
+        return self._atlas
     
     def execute(self, state: InvoiceState) -> InvoiceState:
         """
@@ -50,6 +74,9 @@ class NotifyNode(DeterministicNode):
         invoice_id = state['invoice_id']
         status = state['status']
         
+        # Single timestamp shared by every part of this notification
+        now = datetime.now(timezone.utc)
+        
         # Determine notification type and recipients
         notification_config = self._determine_notification_config(state)
         
@@ -62,7 +89,8 @@ class NotifyNode(DeterministicNode):
             notification_result = self._send_notifications(
                 state,
                 notification_config,
-                email_tool
+                email_tool,
+                now
             )
             
             # Update state
@@ -94,61 +122,24 @@ class NotifyNode(DeterministicNode):
         Returns:
             Notification configuration
         """
-        from core.config.config import config
-        
-        status = state['status']
-        
-        # Success notification
-        if status == 'POSTED':
-            return {
-                'type': 'SUCCESS',
-                'recipients': config.REVIEWER_EMAILS,
-                'subject': 'Invoice Processed Successfully',
-                'priority': 'NORMAL'
-            }
-        
-        # Human review needed
-        elif status == 'PENDING_REVIEW':
-            return {
-                'type': 'REVIEW_NEEDED',
-                'recipients': config.REVIEWER_EMAILS,
-                'subject': 'Invoice Requires Human Review',
-                'priority': 'HIGH'
-            }
-        
-        # Approval needed
-        elif status == 'PENDING_APPROVAL':
-            return {
-                'type': 'APPROVAL_NEEDED',
-                'recipients': config.REVIEWER_EMAILS,
-                'subject': 'Invoice Requires Approval',
-                'priority': 'HIGH'
-            }
-        
-        # Rejected
-        elif status in ['APPROVAL_REJECTED', 'MANUAL_HANDOFF']:
-            return {
-                'type': 'REJECTED',
-                'recipients': config.REVIEWER_EMAILS,
-                'subject': 'Invoice Processing Failed',
-                'priority': 'HIGH'
-            }
+        notification_type, subject, priority = NOTIFICATION_CONFIGS.get(
+            state['status'], DEFAULT_NOTIFICATION_CONFIG
+        )
         
-        # Default
-        else:
-            return {
-                'type': 'INFO',
-                'recipients': config.REVIEWER_EMAILS,
-                'subject': 'Invoice Processing Update',
-                'priority': 'NORMAL'
-            }
+        return {
+            'type': notification_type,
+            'recipients': config.REVIEWER_EMAILS,
+            'subject': subject,
+            'priority': priority
+        }
     
-    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0))
+    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0), failure_class='notification')
     def _send_notifications(
         self,
         state: InvoiceState,
         config: Dict[str, Any],
-        email_tool: Dict[str, Any]
+        email_tool: Dict[str, Any],
+        now: datetime
     ) -> Dict[str, Any]:
         """
         Send email notifications
@@ -157,6 +148,7 @@ class NotifyNode(DeterministicNode):
             state: Current workflow state
             config: Notification configuration
             email_tool: Selected email tool info
+            now: Timestamp of this NOTIFY execution (UTC)
             
         Returns:
             Notification result
@@ -165,7 +157,7 @@ class NotifyNode(DeterministicNode):
         notification_type = config['type']
         
         # Build email content
-        email_content = self._build_email_content(state, notification_type)
+        email_content = self._build_email_content(state, notification_type, now)
         
         # Send via SendGrid (real email)
         logger.info(f"Sending {notification_type} notification via {tool_name}")
@@ -180,12 +172,9 @@ class NotifyNode(DeterministicNode):
         
         # Actually send the email via ATLAS MCP
         try:
-            from integrations.mcp.atlas_mcp_client import get_atlas_client
-            
-            atlas = get_atlas_client()
             extracted_data = state.get('extracted_data', {})
             
-            notification_result = atlas.send_notification(
+            notification_result = self._atlas_client().send_notification(
                 notification_type=notification_type,
                 recipients=config['recipients'],
                 data={
@@ -202,7 +191,7 @@ class NotifyNode(DeterministicNode):
             return {
                 'recipients': config['recipients'],
                 'type': notification_type,
-                'timestamp': datetime.utcnow().isoformat(),
+                'timestamp': now.isoformat(),
                 'email_sent': notification_result.get('sent', False),
                 'email_ids': notification_result.get('notification_ids', []),
                 'service': notification_result.get('service', 'unknown')
@@ -214,19 +203,25 @@ class NotifyNode(DeterministicNode):
             return {
                 'recipients': config['recipients'],
                 'type': notification_type,
-                'timestamp': datetime.utcnow().isoformat(),
+                'timestamp': now.isoformat(),
                 'email_sent': False,
                 'email_ids': [f"MSG-{i:03d}" for i in range(len(config['recipients']))],
                 'error': str(e)
             }
     
-    def _build_email_content(self, state: InvoiceState, notification_type: str) -> str:
+    def _build_email_content(
+        self,
+        state: InvoiceState,
+        notification_type: str,
+        now: datetime
+    ) -> str:
         """
         Build email content based on notification type
         
         Args:
             state: Current workflow state
             notification_type: Type of notification
+            now: Timestamp of this NOTIFY execution (UTC)
             
         Returns:
             Email content (plain text)
@@ -265,7 +260,7 @@ Status: {state.get('status', 'Unknown')}
         # Footer
         content += f"""
 ================================
-Timestamp: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
+Timestamp: {now.strftime('%Y-%m-%d %H:%M:%S UTC')}
 System: Invoice Processing Agent
 """
         
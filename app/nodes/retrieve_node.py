@@ -3,16 +3,78 @@ RETRIEVE Node - Fetch Purchase Orders and GRNs from ERP system
 """
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 
 from app.nodes.base_node import DeterministicNode
 from core.models.state import InvoiceState
 from integrations.tools.bigtool_picker import bigtool_picker
-from core.utils.error_handler import ERPError, with_retry, RetryPolicy
-from core.utils.helpers import is_within_tolerance
+from core.utils.error_handler import ERPError, CircuitBreaker, with_retry, RetryPolicy
+from core.utils.helpers import calculate_tolerance
 from core.utils.logging_config import get_logger
+from integrations.mcp.atlas_mcp_client import get_atlas_client
 
 logger = get_logger(__name__)
 
+# Shared across invoices: once ATLAS keeps failing, go straight to mock data
+_atlas_breaker = CircuitBreaker(failure_threshold=5, recovery_timeout=30.0)
+
+
+# Mock ERP data used when ATLAS MCP is unavailable.
+# Built once at import; vendor_id is filled in per request on a shallow copy.
+MOCK_POS = [
+    {
+        'po_number': 'PO-2024-001',
+        'vendor_id': None,
+        'po_date': '2024-11-15',
+        'total_amount': 3300.00,
+        'status': 'APPROVED',
+        'line_items': [
+            {'item_code': 'SRV-001', 'description': 'Professional Services', 'quantity': 10, 'unit_price': 150.00, 'amount': 1500.00},
+            {'item_code': 'SRV-002', 'description': 'Consulting Hours', 'quantity': 5, 'unit_price': 200.00, 'amount': 1000.00},
+            {'item_code': 'LIC-001', 'description': 'Software License', 'quantity': 1, 'unit_price': 500.00, 'amount': 500.00}
+        ],
+        'subtotal': 3000.00,
+        'tax_amount': 300.00,
+        'delivery_date': '2024-12-01'
+    }
+]
+
+MOCK_GRNS = [
+    {
+        'grn_number': 'GRN-2024-001',
+        'po_number': 'PO-2024-001',
+        'vendor_id': None,
+        'receipt_date': '2024-12-01',
+        'items': [
+            {'item_code': 'SRV-001', 'description': 'Professional Services', 'quantity_received': 10},
+            {'item_code': 'SRV-002', 'description': 'Consulting Hours', 'quantity_received': 5},
+            {'item_code': 'LIC-001', 'description': 'Software License', 'quantity_received': 1}
+        ],
+        'status': 'COMPLETED'
+    }
+]
+
+MOCK_HISTORY = [
+    {
+        'invoice_id': 'INV-HIST-001',
+        'invoice_number': 'INV-2024-000',
+        'vendor_id': None,
+        'invoice_date': '2024-11-01',
+        'total_amount': 2500.00,
+        'status': 'PAID',
+        'payment_date': '2024-11-30'
+    },
+    {
+        'invoice_id': 'INV-HIST-002',
+        'invoice_number': 'INV-2024-999',
+        'vendor_id': None,
+        'invoice_date': '2024-10-15',
+        'total_amount': 3000.00,
+        'status': 'PAID',
+        'payment_date': '2024-11-14'
+    }
+]
+
 
 class RetrieveNode(DeterministicNode):
     """
@@ -31,6 +93,35 @@ class RetrieveNode(DeterministicNode):
             name="RETRIEVE",
             retry_policy=RetryPolicy(max_retries=3, backoff_seconds=2.0)
         )
+        self._atlas = None
+    
+    def _atlas_client(self):
+        """
+        Get the ATLAS MCP client, resolved on first use
+        
+        Resolved lazily so a failure to create the client is handled by the
+        mock-data fallback in each retrieval method.
+        """
+        if self._atlas is None:
+            self._atlas = get_atlas_client()
+        return self._atlas
+    
+    def _call_atlas(self, method: str, **kwargs) -> Any:
+        """
+        Call an ATLAS MCP client method through the circuit breaker
+        
+        Raises ERPError without touching ATLAS while the breaker is open, so the
+        caller's mock-data fallback runs immediately.
+        """
+        if _atlas_breaker.is_open:
+            raise ERPError("ATLAS MCP circuit breaker open", node=self.name)
+        try:
+            result = getattr(self._atlas_client(), method)(**kwargs)
+        except Exception:
+            _atlas_breaker.record_failure()
+            raise
+        _atlas_breaker.record_success()
+        return result
     
     def execute(self, state: InvoiceState) -> InvoiceState:
         """
@@ -52,12 +143,17 @@ class RetrieveNode(DeterministicNode):
         
         # Select ERP connector
         erp_tool = bigtool_picker.select('erp_connector')
-        logger.info(f"Selected ERP connector: {erp_tool['name']}")
+        logger.info("Selected ERP connector: %s", erp_tool['name'])
         
-        # Retrieve data from ERP
-        matched_pos = self._retrieve_purchase_orders(extracted_data, vendor_info, erp_tool)
-        matched_grns = self._retrieve_grns(extracted_data, vendor_info, erp_tool)
-        history = self._retrieve_historical_invoices(vendor_info, erp_tool)
+        # Retrieve data from ERP in one ATLAS round trip, falling back to separate fetches
+        try:
+            matched_pos, matched_grns, history = self._retrieve_bundle(extracted_data, vendor_info)
+        except Exception as e:
+            logger.warning("ATLAS MCP bundle fetch unavailable: %s", e)
+            logger.info("Falling back to separate PO/GRN/history retrieval")
+            matched_pos, matched_grns, history = self._retrieve_separately(
+                extracted_data, vendor_info, erp_tool
+            )
         
         # Update state
         state['matched_pos'] = matched_pos
@@ -67,13 +163,79 @@ class RetrieveNode(DeterministicNode):
         state['status'] = 'RETRIEVED'
         
         logger.info(
-            f"Retrieval complete - POs: {len(matched_pos)}, "
-            f"GRNs: {len(matched_grns)}, History: {len(history)}"
+            "Retrieval complete - POs: %d, GRNs: %d, History: %d",
+            len(matched_pos), len(matched_grns), len(history)
         )
         
         return state
     
-    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0))
+    def _retrieve_bundle(
+        self,
+        extracted_data: Dict[str, Any],
+        vendor_info: Dict[str, Any]
+    ) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Retrieve POs, GRNs and historical invoices with a single ATLAS MCP call
+        
+        Args:
+            extracted_data: Extracted invoice data
+            vendor_info: Vendor information
+            
+        Returns:
+            Tuple of (matched_pos, matched_grns, history)
+        """
+        vendor_name = vendor_info.get('vendor_name')
+        
+        logger.info("Using ATLAS MCP bundle fetch for vendor %s", vendor_name)
+        bundle = self._call_atlas(
+            'fetch_bundle',
+            vendor_id=vendor_info.get('vendor_id'),
+            vendor_name=vendor_name,
+            amount=extracted_data.get('total_amount', 0),
+            po_number="PO-2024-001",  # Would come from matched POs in real scenario
+            history_limit=10
+        )
+        
+        logger.info(
+            "Found %d POs, %d GRNs, %d historical invoices from ATLAS",
+            len(bundle['pos']), len(bundle['grns']), len(bundle['history'])
+        )
+        return bundle['pos'], bundle['grns'], bundle['history']
+    
+    def _retrieve_separately(
+        self,
+        extracted_data: Dict[str, Any],
+        vendor_info: Dict[str, Any],
+        erp_tool: Dict[str, Any]
+    ) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Retrieve POs, GRNs and historical invoices with one call each
+        
+        The three fetches are independent, so they run concurrently. Each one
+        falls back to mock data on its own if ATLAS MCP is unavailable.
+        
+        Args:
+            extracted_data: Extracted invoice data
+            vendor_info: Vendor information
+            erp_tool: Selected ERP tool info
+            
+        Returns:
+            Tuple of (matched_pos, matched_grns, history)
+        """
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            pos_future = executor.submit(
+                self._retrieve_purchase_orders, extracted_data, vendor_info, erp_tool
+            )
+            grns_future = executor.submit(
+                self._retrieve_grns, extracted_data, vendor_info, erp_tool
+            )
+            history_future = executor.submit(
+                self._retrieve_historical_invoices, vendor_info, erp_tool
+            )
+        
+        return pos_future.result(), grns_future.result(), history_future.result()
+    
+    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0), failure_class='erp')
     def _retrieve_purchase_orders(
         self,
         extracted_data: Dict[str, Any],
@@ -95,57 +257,36 @@ class RetrieveNode(DeterministicNode):
         vendor_name = vendor_info.get('vendor_name')
         total_amount = extracted_data.get('total_amount', 0)
         
-        logger.info(f"Retrieving POs for vendor {vendor_name}, amount ~${total_amount}")
+        logger.info("Retrieving POs for vendor %s, amount ~$%s", vendor_name, total_amount)
         
         # Try ATLAS MCP first
         try:
-            from integrations.mcp.atlas_mcp_client import get_atlas_client
-            
             logger.info("Using ATLAS MCP for PO retrieval")
-            atlas_client = get_atlas_client()
-            matched_pos = atlas_client.fetch_po(
+            matched_pos = self._call_atlas(
+                'fetch_po',
                 vendor_id=vendor_id,
                 vendor_name=vendor_name,
                 amount=total_amount
             )
             
-            logger.info(f"Found {len(matched_pos)} matching POs from ATLAS")
+            logger.info("Found %d matching POs from ATLAS", len(matched_pos))
             return matched_pos
             
         except Exception as e:
-            logger.warning(f"ATLAS MCP unavailable: {e}")
+            logger.warning("ATLAS MCP unavailable: %s", e)
             logger.info("Falling back to mock ERP data")
             
-            # Fallback to mock data
-            mock_pos = [
-                {
-                    'po_number': 'PO-2024-001',
-                    'vendor_id': vendor_id,
-                    'po_date': '2024-11-15',
-                    'total_amount': 3300.00,
-                    'status': 'APPROVED',
-                    'line_items': [
-                        {'item_code': 'SRV-001', 'description': 'Professional Services', 'quantity': 10, 'unit_price': 150.00, 'amount': 1500.00},
-                        {'item_code': 'SRV-002', 'description': 'Consulting Hours', 'quantity': 5, 'unit_price': 200.00, 'amount': 1000.00},
-                        {'item_code': 'LIC-001', 'description': 'Software License', 'quantity': 1, 'unit_price': 500.00, 'amount': 500.00}
-                    ],
-                    'subtotal': 3000.00,
-                    'tax_amount': 300.00,
-                    'delivery_date': '2024-12-01'
-                }
-            ]
-            
-            # Filter POs by amount tolerance (±10%)
-            tolerance_pct = 10.0
+            # Fallback to mock data, filtered by amount tolerance (±10%)
+            min_amount, max_amount = calculate_tolerance(total_amount, 10.0)
             matched_pos = [
-                po for po in mock_pos
-                if is_within_tolerance(po['total_amount'], total_amount, tolerance_pct)
+                {**po, 'vendor_id': vendor_id} for po in MOCK_POS
+                if min_amount <= po['total_amount'] <= max_amount
             ]
             
-            logger.info(f"Found {len(matched_pos)} matching POs from mock data")
+            logger.info("Found %d matching POs from mock data", len(matched_pos))
             return matched_pos
     
-    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0))
+    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0), failure_class='erp')
     def _retrieve_grns(
         self,
         extracted_data: Dict[str, Any],
@@ -166,46 +307,31 @@ class RetrieveNode(DeterministicNode):
         vendor_id = vendor_info.get('vendor_id')
         vendor_name = vendor_info.get('vendor_name')
         
-        logger.info(f"Retrieving GRNs for vendor {vendor_name}")
+        logger.info("Retrieving GRNs for vendor %s", vendor_name)
         
         # Try ATLAS MCP first
         try:
-            from integrations.mcp.atlas_mcp_client import get_atlas_client
-            
             logger.info("Using ATLAS MCP for GRN retrieval")
-            atlas_client = get_atlas_client()
-            matched_grns = atlas_client.fetch_grn(
+            matched_grns = self._call_atlas(
+                'fetch_grn',
                 po_number="PO-2024-001",  # Would come from matched POs in real scenario
                 vendor_id=vendor_id
             )
             
-            logger.info(f"Found {len(matched_grns)} GRNs from ATLAS")
+            logger.info("Found %d GRNs from ATLAS", len(matched_grns))
             return matched_grns
             
         except Exception as e:
-            logger.warning(f"ATLAS MCP unavailable: {e}")
+            logger.warning("ATLAS MCP unavailable: %s", e)
             logger.info("Falling back to mock GRN data")
             
             # Fallback to mock data
-            mock_grns = [
-                {
-                    'grn_number': 'GRN-2024-001',
-                    'po_number': 'PO-2024-001',
-                    'vendor_id': vendor_id,
-                    'receipt_date': '2024-12-01',
-                    'items': [
-                        {'item_code': 'SRV-001', 'description': 'Professional Services', 'quantity_received': 10},
-                        {'item_code': 'SRV-002', 'description': 'Consulting Hours', 'quantity_received': 5},
-                        {'item_code': 'LIC-001', 'description': 'Software License', 'quantity_received': 1}
-                    ],
-                    'status': 'COMPLETED'
-                }
-            ]
+            mock_grns = [{**grn, 'vendor_id': vendor_id} for grn in MOCK_GRNS]
             
-            logger.info(f"Found {len(mock_grns)} GRNs from mock data")
+            logger.info("Found %d GRNs from mock data", len(mock_grns))
             return mock_grns
     
-    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0))
+    @with_retry(retry_policy=RetryPolicy(max_retries=2, backoff_seconds=1.0), failure_class='erp')
     def _retrieve_historical_invoices(
         self,
         vendor_info: Dict[str, Any],
@@ -224,50 +350,29 @@ class RetrieveNode(DeterministicNode):
         vendor_id = vendor_info.get('vendor_id')
         vendor_name = vendor_info.get('vendor_name')
         
-        logger.info(f"Retrieving historical invoices for vendor {vendor_name}")
+        logger.info("Retrieving historical invoices for vendor %s", vendor_name)
         
         # Try ATLAS MCP first
         try:
-            from integrations.mcp.atlas_mcp_client import get_atlas_client
-            
             logger.info("Using ATLAS MCP for historical invoice retrieval")
-            atlas_client = get_atlas_client()
-            history = atlas_client.fetch_history(
+            history = self._call_atlas(
+                'fetch_history',
                 vendor_id=vendor_id,
                 vendor_name=vendor_name,
                 limit=10
             )
             
-            logger.info(f"Found {len(history)} historical invoices from ATLAS")
+            logger.info("Found %d historical invoices from ATLAS", len(history))
             return history
             
         except Exception as e:
-            logger.warning(f"ATLAS MCP unavailable: {e}")
+            logger.warning("ATLAS MCP unavailable: %s", e)
             logger.info("Falling back to mock historical data")
             
             # Fallback to mock data
-            mock_history = [
-                {
-                    'invoice_id': 'INV-HIST-001',
-                    'invoice_number': 'INV-2024-000',
-                    'vendor_id': vendor_id,
-                    'invoice_date': '2024-11-01',
-                    'total_amount': 2500.00,
-                    'status': 'PAID',
-                    'payment_date': '2024-11-30'
-                },
-                {
-                    'invoice_id': 'INV-HIST-002',
-                    'invoice_number': 'INV-2024-999',
-                    'vendor_id': vendor_id,
-                    'invoice_date': '2024-10-15',
-                    'total_amount': 3000.00,
-                    'status': 'PAID',
-                    'payment_date': '2024-11-14'
-                }
-            ]
+            mock_history = [{**invoice, 'vendor_id': vendor_id} for invoice in MOCK_HISTORY]
             
-            logger.info(f"Found {len(mock_history)} historical invoices from mock data")
+            logger.info("Found %d historical invoices from mock data", len(mock_history))
             return mock_history
 
 
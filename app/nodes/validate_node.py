@@ -1,16 +1,95 @@
 """
 VALIDATE Node - Validate extracted invoice fields
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import re
 
 from app.nodes.base_node import DeterministicNode
+from core.config.config import config
 from core.models.state import InvoiceState
 from core.utils.helpers import parse_date
 from core.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Simple US EIN format check: XX-XXXXXXX
+EIN_PATTERN = re.compile(r'^\d{2}-\d{7}$')
+EIN_LENGTH = 10
+
+# Required extracted fields, in reporting order
+REQUIRED_FIELDS = ('vendor_name', 'invoice_number', 'invoice_date', 'total_amount')
+
+# Amount limits
+MAX_TOTAL_AMOUNT = 1000000
+TOTAL_TOLERANCE = 0.02  # $0.02 tolerance for rounding
+
+
+# Maximum number of (invoice_number, vendor_name) keys kept by find_duplicate_invoice_id
+DUPLICATE_CACHE_SIZE = 4096
+
+# Stored invoice IDs per (invoice_number, vendor_name), only for lookups that found
+# a duplicate; see find_duplicate_invoice_id
+_duplicate_ids_cache: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+
+
+def find_duplicate_invoice_id(invoice_number: str, vendor_name: str, invoice_id: str) -> Optional[str]:
+    """
+    Find a stored invoice, other than invoice_id, with the given number and vendor
+    
+    Only lookups that found a duplicate are cached. A lookup that finds none is
+    repeated against the database every time, so invoices saved by another
+    worker or process are always seen. Anything that rewrites invoice rows must
+    call clear_duplicate_cache() after committing (see CompleteNode).
+    
+    Args:
+        invoice_number: Invoice number
+        vendor_name: Vendor name
+        invoice_id: ID of the invoice being validated
+        
+    Returns:
+        ID of an existing duplicate invoice, or None
+    """
+    key = (invoice_number, vendor_name)
+    existing_id = next(
+        (id_ for id_ in _duplicate_ids_cache.get(key, ()) if id_ != invoice_id), None
+    )
+    if existing_id is not None:
+        return existing_id
+    
+    existing_ids = _query_invoice_ids(invoice_number, vendor_name)
+    existing_id = next((id_ for id_ in existing_ids if id_ != invoice_id), None)
+    if existing_id is not None:
+        if len(_duplicate_ids_cache) >= DUPLICATE_CACHE_SIZE:
+            _duplicate_ids_cache.clear()
+        _duplicate_ids_cache[key] = existing_ids
+    return existing_id
+
+
+def clear_duplicate_cache():
+    """Drop cached duplicate lookups, e.g. after invoice rows are rewritten"""
+    _duplicate_ids_cache.clear()
+
+
+def _query_invoice_ids(invoice_number: str, vendor_name: str) -> Tuple[str, ...]:
+    """
+    Look up stored invoice IDs with the given number and vendor
+    
+    Returns:
+        Up to two matching invoice IDs (enough to find one that is not the caller's)
+    """
+    from core.models.database import get_session, Invoice
+    
+    session = get_session()
+    try:
+        rows = session.query(Invoice.invoice_id).filter(
+            Invoice.invoice_number == invoice_number,
+            Invoice.vendor_name == vendor_name
+        ).limit(2).all()
+        return tuple(row[0] for row in rows)
+    finally:
+        session.close()
+
 
 class ValidateNode(DeterministicNode):
     """
@@ -46,14 +125,7 @@ class ValidateNode(DeterministicNode):
         vendor_info = state.get('vendor_info', {})
         
         # Run all validation checks
-        validation_errors = []
-        
-        validation_errors.extend(self._validate_required_fields(extracted_data))
-        validation_errors.extend(self._validate_amounts(extracted_data))
-        validation_errors.extend(self._validate_dates(extracted_data))
-        validation_errors.extend(self._validate_vendor(extracted_data, vendor_info))
-        validation_errors.extend(self._validate_business_rules(extracted_data, vendor_info))
-        validation_errors.extend(self._check_duplicates(state))
+        validation_errors = self._validate_all(extracted_data, vendor_info, state['invoice_id'])
         
         # Determine if valid
         is_valid = len(validation_errors) == 0
@@ -72,47 +144,79 @@ class ValidateNode(DeterministicNode):
         
         return state
     
-    def _validate_required_fields(self, data: Dict[str, Any]) -> List[str]:
-        """Validate that required fields are present"""
-        errors = []
-        required_fields = [
-            'vendor_name',
-            'invoice_number',
-            'invoice_date',
-            'total_amount'
+    def _validate_all(
+        self,
+        data: Dict[str, Any],
+        vendor_info: Dict[str, Any],
+        invoice_id: str
+    ) -> List[str]:
+        """
+        Run every validation check, reading each shared field from data once
+        
+        Args:
+            data: Extracted invoice data
+            vendor_info: Vendor information
+            invoice_id: ID of the invoice being validated
+            
+        Returns:
+            Validation errors, in check order
+        """
+        vendor_name = data.get('vendor_name')
+        invoice_number = data.get('invoice_number')
+        invoice_date_str = data.get('invoice_date')
+        total_amount = data.get('total_amount')
+        line_items = data.get('line_items', [])
+        
+        # Required fields (values line up with REQUIRED_FIELDS)
+        required_values = (vendor_name, invoice_number, invoice_date_str, total_amount)
+        errors = [
+            f"Missing required field: {field}"
+            for field, value in zip(REQUIRED_FIELDS, required_values)
+            if value is None or value == ''
         ]
+        missing_required = bool(errors)
+        
+        errors.extend(self._validate_amounts(data, total_amount, line_items))
+        errors.extend(self._validate_dates(invoice_date_str, data.get('due_date')))
+        errors.extend(self._validate_vendor(vendor_name, data.get('tax_id'), vendor_info))
         
-        for field in required_fields:
-            if field not in data or data[field] is None or data[field] == '':
-                errors.append(f"Missing required field: {field}")
+        # Without the required fields, business-rule and duplicate (DB) checks only add noise
+        if missing_required and config.VALIDATE_FAIL_FAST:
+            logger.info("Required fields missing - skipping business rule and duplicate checks")
+            return errors
+        
+        errors.extend(self._validate_business_rules(total_amount, line_items, vendor_info))
+        errors.extend(self._check_duplicates(invoice_number, vendor_name, invoice_id))
         
         return errors
     
-    def _validate_amounts(self, data: Dict[str, Any]) -> List[str]:
+    def _validate_amounts(
+        self,
+        data: Dict[str, Any],
+        total_amount: Any,
+        line_items: List[Dict[str, Any]]
+    ) -> List[str]:
         """Validate amount fields"""
         errors = []
         
         # Check total amount
-        total_amount = data.get('total_amount')
         if total_amount is not None:
             if not isinstance(total_amount, (int, float)):
                 errors.append(f"Invalid total_amount format: {total_amount}")
             elif total_amount <= 0:
                 errors.append(f"Total amount must be positive: {total_amount}")
-            elif total_amount > 1000000:
+            elif total_amount > MAX_TOTAL_AMOUNT:
                 errors.append(f"Total amount exceeds maximum limit: ${total_amount:,.2f}")
         
         # Validate line items sum matches total (if applicable)
-        line_items = data.get('line_items', [])
         if line_items and total_amount:
             line_items_total = sum(item.get('amount', 0) for item in line_items)
             subtotal = data.get('subtotal', line_items_total)
             tax_amount = data.get('tax_amount', 0)
             
             expected_total = subtotal + tax_amount
-            tolerance = 0.02  # $0.02 tolerance for rounding
             
-            if abs(expected_total - total_amount) > tolerance:
+            if abs(expected_total - total_amount) > TOTAL_TOLERANCE:
                 errors.append(
                     f"Total amount mismatch: Expected ${expected_total:.2f} "
                     f"(Subtotal ${subtotal:.2f} + Tax ${tax_amount:.2f}), "
@@ -121,33 +225,33 @@ class ValidateNode(DeterministicNode):
         
         return errors
     
-    def _validate_dates(self, data: Dict[str, Any]) -> List[str]:
+    def _validate_dates(self, invoice_date_str: Any, due_date_str: Any) -> List[str]:
         """Validate date fields"""
         errors = []
         
-        # Validate invoice date
-        invoice_date_str = data.get('invoice_date')
+        # Validate invoice date (parsed once, reused for the due date check)
+        invoice_date = None
         if invoice_date_str:
             invoice_date = parse_date(invoice_date_str)
             if invoice_date is None:
                 errors.append(f"Invalid invoice_date format: {invoice_date_str}")
             else:
+                now = datetime.now()
+                
                 # Check if date is not in the future
-                if invoice_date > datetime.now():
+                if invoice_date > now:
                     errors.append(f"Invoice date cannot be in the future: {invoice_date_str}")
                 
                 # Check if date is not too old (e.g., more than 2 years)
-                days_old = (datetime.now() - invoice_date).days
+                days_old = (now - invoice_date).days
                 if days_old > 730:  # 2 years
                     errors.append(f"Invoice date is too old ({days_old} days): {invoice_date_str}")
         
         # Validate due date if present
-        due_date_str = data.get('due_date')
-        if due_date_str and invoice_date_str:
+        if due_date_str and invoice_date:
             due_date = parse_date(due_date_str)
-            invoice_date = parse_date(invoice_date_str)
             
-            if due_date and invoice_date:
+            if due_date:
                 if due_date < invoice_date:
                     errors.append(
                         f"Due date ({due_date_str}) cannot be before invoice date ({invoice_date_str})"
@@ -157,7 +261,8 @@ class ValidateNode(DeterministicNode):
     
     def _validate_vendor(
         self,
-        data: Dict[str, Any],
+        vendor_name: Any,
+        tax_id: Any,
         vendor_info: Dict[str, Any]
     ) -> List[str]:
         """Validate vendor information"""
@@ -166,30 +271,27 @@ class ValidateNode(DeterministicNode):
         # Check if vendor is approved
         if vendor_info:
             if not vendor_info.get('is_approved_vendor', False):
-                errors.append(f"Vendor is not approved: {data.get('vendor_name')}")
+                errors.append(f"Vendor is not approved: {vendor_name}")
         
         # Validate tax ID format if present
-        tax_id = data.get('tax_id')
         if tax_id:
-            # Simple US EIN format check: XX-XXXXXXX
-            import re
-            if not re.match(r'^\d{2}-\d{7}$', tax_id):
+            # Wrong length can never match, so skip the regex engine for it
+            if len(tax_id) != EIN_LENGTH or not EIN_PATTERN.match(tax_id):
                 errors.append(f"Invalid tax ID format: {tax_id} (expected XX-XXXXXXX)")
         
         return errors
     
     def _validate_business_rules(
         self,
-        data: Dict[str, Any],
+        total_amount: Any,
+        line_items: List[Dict[str, Any]],
         vendor_info: Dict[str, Any]
     ) -> List[str]:
         """Validate business rules"""
         errors = []
         
-        total_amount = data.get('total_amount', 0)
-        
-        # Check credit limit
-        if vendor_info:
+        # Check credit limit (a missing total is already reported as a required field)
+        if vendor_info and total_amount is not None:
             credit_limit = vendor_info.get('credit_limit', 0)
             if total_amount > credit_limit:
                 errors.append(
@@ -198,59 +300,48 @@ class ValidateNode(DeterministicNode):
                 )
         
         # Validate line items
-        line_items = data.get('line_items', [])
         for i, item in enumerate(line_items, 1):
+            # Each field is looked up once per item
+            quantity = item.get('quantity')
+            unit_price = item.get('unit_price')
+            amount = item.get('amount')
+            
             # Check required fields in line items
-            if 'description' not in item or not item['description']:
+            if not item.get('description'):
                 errors.append(f"Line item {i}: Missing description")
             
-            if 'quantity' not in item or item['quantity'] <= 0:
+            if quantity is None or quantity <= 0:
                 errors.append(f"Line item {i}: Invalid quantity")
             
-            if 'unit_price' not in item or item['unit_price'] < 0:
+            if unit_price is None or unit_price < 0:
                 errors.append(f"Line item {i}: Invalid unit price")
             
             # Validate line item calculation
-            if all(k in item for k in ['quantity', 'unit_price', 'amount']):
-                expected_amount = item['quantity'] * item['unit_price']
-                if abs(expected_amount - item['amount']) > 0.01:
+            if quantity is not None and unit_price is not None and amount is not None:
+                expected_amount = quantity * unit_price
+                if abs(expected_amount - amount) > 0.01:
                     errors.append(
                         f"Line item {i}: Amount mismatch - "
-                        f"{item['quantity']} x ${item['unit_price']} = ${expected_amount:.2f}, "
-                        f"but got ${item['amount']:.2f}"
+                        f"{quantity} x ${unit_price} = ${expected_amount:.2f}, "
+                        f"but got ${amount:.2f}"
                     )
         
         return errors
     
-    def _check_duplicates(self, state: InvoiceState) -> List[str]:
+    def _check_duplicates(self, invoice_number: Any, vendor_name: Any, invoice_id: str) -> List[str]:
         """Check for duplicate invoices"""
         errors = []
         
-        # In production, this would query the database
-        # For now, we'll do a simple check
-        from core.models.database import get_session, Invoice
-        
-        extracted_data = state['extracted_data']
-        invoice_number = extracted_data.get('invoice_number')
-        vendor_name = extracted_data.get('vendor_name')
-        
         if invoice_number and vendor_name:
             try:
-                session = get_session()
-                # Check if invoice with same number and vendor exists
-                existing = session.query(Invoice).filter(
-                    Invoice.invoice_number == invoice_number,
-                    Invoice.vendor_name == vendor_name,
-                    Invoice.invoice_id != state['invoice_id']  # Exclude current invoice
-                ).first()
+                # Check if invoice with same number and vendor exists (excluding current invoice)
+                existing_id = find_duplicate_invoice_id(invoice_number, vendor_name, invoice_id)
                 
-                if existing:
+                if existing_id:
                     errors.append(
                         f"Duplicate invoice detected: {invoice_number} from {vendor_name} "
-                        f"(existing invoice: {existing.invoice_id})"
+                        f"(existing invoice: {existing_id})"
                     )
-                
-                session.close()
             except Exception as e:
                 logger.warning(f"Could not check for duplicates: {e}")
         
@@ -2,6 +2,7 @@
 LangGraph Workflow - Complete invoice processing workflow orchestrator
 """
 from typing import Literal
+import threading
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 
@@ -24,6 +25,10 @@ from core.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# The graph topology is static, so it is compiled once per process and shared
+_compiled_workflow = None
+_compile_lock = threading.Lock()
+
 
 # Conditional edge functions
 def should_checkpoint(state: InvoiceState) -> Literal["checkpoint", "reconcile"]:
@@ -178,9 +183,48 @@ def get_compiled_workflow():
     """
     Get compiled workflow with memory checkpointer and HITL interrupts
     
+    The workflow is built and compiled on first call and reused afterwards.
+    Runs share its checkpointer, so each must stream with its own thread_id
+    and release it afterwards (see release_workflow_thread).
+    
     Returns:
         Compiled workflow ready for execution
     """
+    global _compiled_workflow
+    if _compiled_workflow is not None:
+        return _compiled_workflow
+    
+    with _compile_lock:
+        if _compiled_workflow is None:
+            _compiled_workflow = _compile_workflow()
+    return _compiled_workflow
+
+
+def release_workflow_thread(thread_id: str):
+    """
+    Drop a finished run's checkpoints from the shared in-memory checkpointer
+    
+    This includes runs paused at the HITL interrupt: their in-memory thread is
+    dropped on purpose, because HITL reviews resume from the checkpoint saved
+    in the database, not from this thread, so nothing reads it once the run
+    has stopped.
+    
+    Best effort: checkpointer releases without delete_thread (or a failed
+    delete) just leave the thread in memory, as before.
+    
+    Args:
+        thread_id: Checkpoint thread the run was streamed with
+    """
+    if _compiled_workflow is None:
+        return
+    try:
+        _compiled_workflow.checkpointer.delete_thread(thread_id)
+    except Exception as e:
+        logger.debug("Could not release checkpoint thread %s: %s", thread_id, e)
+
+
+def _compile_workflow():
+    """Build and compile the workflow (called once by get_compiled_workflow)"""
     workflow = create_workflow()
     
     # Create memory checkpointer for state persistence
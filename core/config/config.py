@@ -9,6 +9,9 @@ from pathlib import Path
 # Load environment variables
 load_dotenv()
 
+# libyaml-backed loader when PyYAML was built with it, pure-Python otherwise
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 class Config:
     """Application configuration"""
@@ -38,6 +41,9 @@ class Config:
     TOLERANCE_PERCENTAGE = float(os.getenv('TOLERANCE_PERCENTAGE', '5.0'))
     AUTO_APPROVE_THRESHOLD = float(os.getenv('AUTO_APPROVE_THRESHOLD', '1000.00'))
     
+    # Validation
+    VALIDATE_FAIL_FAST = os.getenv('VALIDATE_FAIL_FAST', 'True').lower() == 'true'
+    
     # Human Review
     REVIEW_UI_URL = os.getenv('REVIEW_UI_URL', 'http://localhost:8000/review')
     HUMAN_REVIEW_API_URL = os.getenv('HUMAN_REVIEW_API_URL', 'http://localhost:8000')
@@ -51,15 +57,42 @@ class Config:
     # Checkpoint Storage
     CHECKPOINT_DB_PATH = os.getenv('CHECKPOINT_DB_PATH', './checkpoints/checkpoints.db')
     
+    # Parsed tools.yaml per path, as (mtime_ns, parsed config) of the last load
+    _tools_config_cache = {}
+    
     @classmethod
-    def load_tools_config(cls):
-        """Load tools configuration from YAML"""
-        config_path = Path(__file__).parent / 'tools.yaml'
-        if config_path.exists():
-            with open(config_path, 'r') as f:
-                return yaml.safe_load(f)
-        return {}
-
+    def load_tools_config(cls, config_path=None):
+        """
+        Load tools configuration from YAML (re-parsed only when the file changes)
+        
+        The returned dict is shared between callers; copy it before modifying.
+        
+        Args:
+            config_path: Path to a tools.yaml, defaults to the bundled one (which
+                loads as an empty config if missing)
+            
+        Returns:
+            Parsed tools configuration
+        """
+        default = config_path is None
+        if default:
+            config_path = Path(__file__).parent / 'tools.yaml'
+        try:
+            mtime_ns = os.stat(config_path).st_mtime_ns
+        except FileNotFoundError:
+            if default:
+                return {}
+            raise
+        
+        key = str(config_path)
+        cached = cls._tools_config_cache.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        
+        with open(config_path, 'r') as f:
+            tools_config = yaml.load(f, Loader=YAML_LOADER)
+        cls._tools_config_cache[key] = (mtime_ns, tools_config)
+        return tools_config
 
 # Create singleton instance
 config = Config()
@@ -1,11 +1,14 @@
 """
 Database models and schema for Invoice Processing Agent
 """
-from sqlalchemy import create_engine, Column, String, Float, Boolean, DateTime, JSON, Text
+from sqlalchemy import create_engine, Column, String, Float, Boolean, DateTime, JSON, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 import os
+import itertools
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -48,6 +51,11 @@ class Invoice(Base):
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Duplicate detection looks invoices up by number and vendor
+        Index('ix_invoice_number_vendor', 'invoice_number', 'vendor_name'),
+    )
 
 
 class Checkpoint(Base):
@@ -76,11 +84,20 @@ class Checkpoint(Base):
         return f"<Checkpoint(id={self.hitl_checkpoint_id}, invoice={self.invoice_id}, status={self.status})>"
 
 
+# Suffix that keeps default audit IDs unique when two rows share a microsecond
+_audit_id_counter = itertools.count()
+
+
+def _default_audit_id() -> str:
+    """Generate a default AuditLog ID from the current time and a process counter"""
+    return f"AUDIT-{time.time_ns() // 1000}-{next(_audit_id_counter)}"
+
+
 class AuditLog(Base):
     """Audit log table"""
     __tablename__ = 'audit_logs'
     
-    id = Column(String, primary_key=True, default=lambda: f"AUDIT-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}")
+    id = Column(String, primary_key=True, default=_default_audit_id)
     invoice_id = Column(String, nullable=False)
     node_name = Column(String)
     action = Column(String)
@@ -89,20 +106,46 @@ class AuditLog(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
 
 
+# Engine and session factory, created once on first use and shared by all sessions
+_engine = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Get the shared database engine"""
+    global _engine, _session_factory
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                database_url = os.getenv('DATABASE_URL', 'sqlite:///./invoices.db')
+                engine_options = {'pool_pre_ping': True}
+                if not database_url.startswith('sqlite'):
+                    # SQLite uses its own pool classes, which don't take these
+                    engine_options.update(pool_size=10, max_overflow=20)
+                engine = create_engine(database_url, **engine_options)
+                _session_factory = sessionmaker(bind=engine)
+                _engine = engine
+    return _engine
+
+
 # Database initialization
 def init_db():
     """Initialize database and create tables"""
-    database_url = os.getenv('DATABASE_URL', 'sqlite:///./invoices.db')
-    engine = create_engine(database_url)
+    engine = get_engine()
     Base.metadata.create_all(engine)
+    # create_all skips tables that already exist, so add indexes declared since
+    # (e.g. ix_invoice_number_vendor) to existing databases explicitly
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
     return engine
 
 
 def get_session():
     """Get database session"""
-    database_url = os.getenv('DATABASE_URL', 'sqlite:///./invoices.db')
-    engine = create_engine(database_url)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    if _session_factory is None:
+        get_engine()
+    return _session_factory()
 
 
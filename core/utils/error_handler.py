@@ -1,28 +1,36 @@
 """
 Error handling utilities with retry logic and failure management
 """
+import json
 import time
+import uuid
+import atexit
+import weakref
+import random
 import logging
-from typing import Callable, Any, Optional, Dict, List
+import threading
+from typing import Callable, Any, Optional, Dict, List, Tuple
 from functools import wraps
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Handlers are configured by core.utils.logging_config.setup_logging
 logger = logging.getLogger(__name__)
 
 
 class RetryPolicy:
     """Retry policy configuration"""
     
+    __slots__ = ('max_retries', 'backoff_seconds', 'exponential', 'jitter', 'max_backoff', '_random')
+    
     def __init__(
         self, 
         max_retries: int = 3, 
         backoff_seconds: float = 2.0,
-        exponential: bool = True
+        exponential: bool = True,
+        jitter: bool = True,
+        max_backoff: Optional[float] = None
     ):
         """
         Initialize retry policy
@@ -31,10 +39,16 @@ class RetryPolicy:
             max_retries: Maximum number of retry attempts
             backoff_seconds: Base backoff time in seconds
             exponential: Use exponential backoff if True, constant if False
+            jitter: Sleep a random time up to the backoff (full jitter) if True,
+                so concurrent retries don't hit a recovering service in lockstep
+            max_backoff: Optional ceiling on the backoff time in seconds
         """
         self.max_retries = max_retries
         self.backoff_seconds = backoff_seconds
         self.exponential = exponential
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self._random = random.SystemRandom() if jitter else None
     
     def get_backoff_time(self, attempt: int) -> float:
         """
@@ -47,8 +61,63 @@ class RetryPolicy:
             Backoff time in seconds
         """
         if self.exponential:
-            return self.backoff_seconds * (2 ** attempt)
-        return self.backoff_seconds
+            backoff = self.backoff_seconds * (2 ** attempt)
+        else:
+            backoff = self.backoff_seconds
+        
+        if self.max_backoff is not None:
+            backoff = min(backoff, self.max_backoff)
+        
+        if self.jitter:
+            return self._random.uniform(0, backoff)
+        return backoff
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for an external dependency
+    
+    After failure_threshold consecutive failures the breaker opens and callers
+    should skip the dependency. Once recovery_timeout seconds have passed since
+    the last failure, calls are let through again; a success closes it.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """
+        Initialize circuit breaker
+        
+        Args:
+            failure_threshold: Consecutive failures before the breaker opens
+            recovery_timeout: Seconds to stay open before allowing a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._failures = 0
+        self._last_failure = 0.0
+        self._lock = threading.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        """True while calls to the dependency should be short-circuited"""
+        return (
+            self._failures >= self.failure_threshold
+            and time.monotonic() - self._last_failure < self.recovery_timeout
+        )
+    
+    def record_success(self):
+        """Reset the failure count after a successful call"""
+        with self._lock:
+            self._failures = 0
+    
+    def record_failure(self):
+        """Count a failed call"""
+        with self._lock:
+            self._failures += 1
+            self._last_failure = time.monotonic()
+            if self._failures == self.failure_threshold:
+                logger.warning(
+                    "Circuit breaker opened after %d consecutive failures", self._failures
+                )
 
 
 class InvoiceProcessingError(Exception):
@@ -94,10 +163,76 @@ class CheckpointError(InvoiceProcessingError):
     pass
 
 
+class RetryCoordinator:
+    """
+    Process-wide gate for retries of a shared dependency
+    
+    Retries are grouped by failure class (e.g. 'erp', 'ocr', 'db'). For each class
+    at most max_concurrent_retries retry attempts run at once across all workflows,
+    and a failure that carries a retry_after hint (in its details) holds back every
+    retry of that class until the hint has passed.
+    """
+    
+    def __init__(self, max_concurrent_retries: int = 4):
+        """
+        Initialize retry coordinator
+        
+        Args:
+            max_concurrent_retries: Concurrent retry attempts allowed per failure class
+        """
+        self.max_concurrent_retries = max_concurrent_retries
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._cooldown_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def _get_slots(self, failure_class: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slots = self._slots.get(failure_class)
+            if slots is None:
+                slots = threading.BoundedSemaphore(self.max_concurrent_retries)
+                self._slots[failure_class] = slots
+            return slots
+    
+    def record_failure(self, failure_class: str, error: Exception):
+        """Start a shared cool-down if the error says when to retry"""
+        details = getattr(error, 'details', None)
+        if not isinstance(details, dict):
+            return
+        try:
+            retry_after = float(details.get('retry_after') or 0)
+        except (TypeError, ValueError):
+            return
+        if retry_after <= 0:
+            return
+        until = time.monotonic() + retry_after
+        with self._lock:
+            if until > self._cooldown_until.get(failure_class, 0.0):
+                self._cooldown_until[failure_class] = until
+    
+    def cooldown_remaining(self, failure_class: str) -> float:
+        """Seconds left in the shared cool-down for a failure class"""
+        return max(0.0, self._cooldown_until.get(failure_class, 0.0) - time.monotonic())
+    
+    @contextmanager
+    def retry_slot(self, failure_class: str):
+        """Hold one of the failure class's retry slots for the duration of an attempt"""
+        slots = self._get_slots(failure_class)
+        slots.acquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+
+# Shared by every with_retry(failure_class=...) in the process
+retry_coordinator = RetryCoordinator()
+
+
 def with_retry(
     retry_policy: Optional[RetryPolicy] = None,
     exceptions: tuple = (Exception,),
-    on_retry: Optional[Callable] = None
+    on_retry: Optional[Callable] = None,
+    failure_class: Optional[str] = None
 ):
     """
     Decorator to add retry logic to a function
@@ -106,6 +241,8 @@ def with_retry(
         retry_policy: RetryPolicy instance, defaults to 3 retries with 2s backoff
         exceptions: Tuple of exceptions to catch and retry
         on_retry: Optional callback function called on each retry
+        failure_class: Optional dependency name (e.g. 'erp'); retries with the same
+            class are gated through retry_coordinator
         
     Usage:
         @with_retry(retry_policy=RetryPolicy(max_retries=3))
@@ -117,21 +254,33 @@ def with_retry(
         retry_policy = RetryPolicy()
     
     def decorator(func: Callable) -> Callable:
+        # Policy settings are bound once here rather than looked up per attempt
+        max_retries = retry_policy.max_retries
+        max_attempts = max_retries + 1
+        get_backoff_time = retry_policy.get_backoff_time
+        func_name = func.__name__
+        
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
             last_exception = None
             
-            for attempt in range(retry_policy.max_retries + 1):
+            for attempt in range(max_attempts):
                 try:
+                    if attempt and failure_class:
+                        with retry_coordinator.retry_slot(failure_class):
+                            return func(*args, **kwargs)
                     return func(*args, **kwargs)
                 except exceptions as e:
                     last_exception = e
                     
-                    if attempt < retry_policy.max_retries:
-                        backoff = retry_policy.get_backoff_time(attempt)
+                    if attempt < max_retries:
+                        backoff = get_backoff_time(attempt)
+                        if failure_class:
+                            retry_coordinator.record_failure(failure_class, e)
+                            backoff = max(backoff, retry_coordinator.cooldown_remaining(failure_class))
                         logger.warning(
-                            f"Attempt {attempt + 1}/{retry_policy.max_retries + 1} failed for {func.__name__}: {e}. "
-                            f"Retrying in {backoff}s..."
+                            "Attempt %d/%d failed for %s: %s. Retrying in %.2fs...",
+                            attempt + 1, max_attempts, func_name, e, backoff
                         )
                         
                         if on_retry:
@@ -140,7 +289,8 @@ def with_retry(
                         time.sleep(backoff)
                     else:
                         logger.error(
-                            f"All {retry_policy.max_retries + 1} attempts failed for {func.__name__}: {e}"
+                            "All %d attempts failed for %s: %s",
+                            max_attempts, func_name, e
                         )
             
             # All retries exhausted
@@ -155,15 +305,28 @@ class ErrorHandler:
     Centralized error handler for the invoice processing workflow
     """
     
-    def __init__(self, notify_ops_team: bool = True):
+    def __init__(self, notify_ops_team: bool = True, max_error_log: int = 10000):
         """
         Initialize error handler
         
         Args:
             notify_ops_team: Whether to notify ops team on unrecoverable errors
+            max_error_log: Number of most recent errors kept in error_log
         """
         self.notify_ops_team = notify_ops_team
-        self.error_log: List[Dict[str, Any]] = []
+        self.error_log: deque = deque(maxlen=max_error_log)
+        # Running totals over all handled errors (error_log only keeps the latest)
+        self._total_errors = 0
+        self._recoverable_errors = 0
+        
+        # Failed-state audit rows waiting to be written in one batch, each with
+        # the error info whose 'state_persisted' is set once the row commits
+        self._pending_audit: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        self._dropped_audit_records = 0
+        self._audit_lock = threading.Lock()
+        self._audit_flush_interval = 1.0
+        self._audit_batch_size = 100
+        self._audit_flusher: Optional[threading.Thread] = None
     
     def handle_error(
         self, 
@@ -194,11 +357,16 @@ class ErrorHandler:
         
         # Log the error
         self.error_log.append(error_info)
-        logger.error(f"Error in {node}: {error}")
+        self._total_errors += 1
+        if error_info['recoverable']:
+            self._recoverable_errors += 1
+        logger.error("Error in %s: %s", node, error)
         
         # Handle based on recoverability
         if isinstance(error, InvoiceProcessingError) and not error.recoverable:
-            return self._handle_unrecoverable_error(error, node, state, persist_state)
+            return self._handle_unrecoverable_error(
+                error, node, state, persist_state, timestamp=error_info['timestamp']
+            )
         
         return error_info
     
@@ -207,7 +375,8 @@ class ErrorHandler:
         error: InvoiceProcessingError, 
         node: str,
         state: Optional[Dict[str, Any]] = None,
-        persist_state: bool = True
+        persist_state: bool = True,
+        timestamp: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Handle an unrecoverable error
@@ -217,14 +386,15 @@ class ErrorHandler:
             node: Node where error occurred
             state: Current workflow state
             persist_state: Whether to persist state
+            timestamp: ISO timestamp already taken for this error, if any
             
         Returns:
             Error information with recovery actions
         """
-        logger.critical(f"Unrecoverable error in {node}: {error}")
+        logger.critical("Unrecoverable error in %s: %s", node, error)
         
         error_info = {
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': timestamp or datetime.utcnow().isoformat(),
             'node': node,
             'error_type': type(error).__name__,
             'error_message': error.message,
@@ -232,14 +402,16 @@ class ErrorHandler:
             'action': 'persist_and_fail'
         }
         
-        # Persist state if requested
+        # Persist state if requested; 'state_persisted' turns True once the
+        # queued audit row has been committed by flush_audit_log
         if persist_state and state:
+            error_info['state_persisted'] = False
             try:
                 self._persist_failed_state(state, error_info)
-                error_info['state_persisted'] = True
+                error_info['state_queued'] = True
             except Exception as e:
-                logger.error(f"Failed to persist state: {e}")
-                error_info['state_persisted'] = False
+                logger.error("Failed to queue state for persistence: %s", e)
+                error_info['state_queued'] = False
         
         # Notify ops team
         if self.notify_ops_team:
@@ -253,35 +425,98 @@ class ErrorHandler:
         error_info: Dict[str, Any]
     ):
         """
-        Persist failed state to database
+        Queue failed state for persistence to the database
+        
+        Rows are written in batches by flush_audit_log, either when the batch is
+        full or from a background thread every _audit_flush_interval seconds
+        (and once more at interpreter exit). The error and state are snapshotted
+        as JSON here, so later changes to the live state are not recorded and
+        unserializable state fails now rather than in the flush.
         
         Args:
             state: Workflow state to persist
             error_info: Error information
         """
+        details = json.loads(json.dumps({'error': error_info, 'state': state}, default=str))
+        audit_row = {
+            'id': str(uuid.uuid4()),
+            'invoice_id': state.get('invoice_id', 'unknown'),
+            'node_name': error_info['node'],
+            'action': 'error_persist',
+            'result': 'failed',
+            'details': details,
+            'timestamp': datetime.utcnow()
+        }
+        
+        with self._audit_lock:
+            self._pending_audit.append((audit_row, error_info))
+            batch_full = len(self._pending_audit) >= self._audit_batch_size
+            if self._audit_flusher is None:
+                self._audit_flusher = threading.Thread(
+                    target=self._audit_flush_loop, name='audit-flush', daemon=True
+                )
+                self._audit_flusher.start()
+                _audit_handlers.add(self)
+        
+        logger.info("Failed state queued for persistence for invoice %s", state.get('invoice_id'))
+        if batch_full:
+            self.flush_audit_log()
+    
+    def _audit_flush_loop(self):
+        """Background loop that periodically writes queued audit rows"""
+        while True:
+            time.sleep(self._audit_flush_interval)
+            try:
+                self.flush_audit_log()
+            except Exception as e:
+                logger.error("Audit log flush failed: %s", e)
+    
+    def flush_audit_log(self):
+        """
+        Write all queued failed-state audit rows in a single transaction
+        
+        If the batch insert fails, the rows are retried one at a time and any
+        row that still fails is logged, counted in get_error_summary's
+        'audit_records_dropped' and dropped, so a single bad row cannot hold up
+        the rest of the queue. Each committed row marks its error info as
+        'state_persisted'.
+        """
+        with self._audit_lock:
+            batch, self._pending_audit = self._pending_audit, []
+        if not batch:
+            return
+        
         from core.models.database import get_session, AuditLog
-        import uuid
         
         session = get_session()
         try:
-            audit_entry = AuditLog(
-                id=str(uuid.uuid4()),
-                invoice_id=state.get('invoice_id', 'unknown'),
-                node_name=error_info['node'],
-                action='error_persist',
-                result='failed',
-                details={
-                    'error': error_info,
-                    'state': state
-                }
-            )
-            session.add(audit_entry)
-            session.commit()
-            logger.info(f"Failed state persisted for invoice {state.get('invoice_id')}")
-        except Exception as e:
-            session.rollback()
-            logger.error(f"Failed to persist state to database: {e}")
-            raise
+            try:
+                session.bulk_insert_mappings(AuditLog, [audit_row for audit_row, _ in batch])
+                session.commit()
+                for _, error_info in batch:
+                    error_info['state_persisted'] = True
+                logger.info("Persisted %d failed state audit record(s)", len(batch))
+                return
+            except Exception as e:
+                session.rollback()
+                logger.error("Failed to persist %d audit record(s) in one batch, retrying singly: %s", len(batch), e)
+            
+            persisted = 0
+            for audit_row, error_info in batch:
+                try:
+                    session.bulk_insert_mappings(AuditLog, [audit_row])
+                    session.commit()
+                    error_info['state_persisted'] = True
+                    persisted += 1
+                except Exception as e:
+                    session.rollback()
+                    logger.error(
+                        "Dropped failed state audit record %s for invoice %s: %s",
+                        audit_row['id'], audit_row['invoice_id'], e
+                    )
+            with self._audit_lock:
+                self._dropped_audit_records += len(batch) - persisted
+            logger.info("Persisted %d of %d failed state audit record(s)", persisted, len(batch))
         finally:
             session.close()
     
@@ -299,10 +534,14 @@ class ErrorHandler:
         """
         # In production, this would send email/Slack notification
         logger.critical(
-            f"OPS TEAM NOTIFICATION: Unrecoverable error in {error_info['node']}\n"
-            f"Error: {error_info['error_message']}\n"
-            f"Invoice ID: {state.get('invoice_id') if state else 'unknown'}\n"
-            f"Timestamp: {error_info['timestamp']}"
+            "OPS TEAM NOTIFICATION: Unrecoverable error in %s\n"
+            "Error: %s\n"
+            "Invoice ID: %s\n"
+            "Timestamp: %s",
+            error_info['node'],
+            error_info['error_message'],
+            state.get('invoice_id') if state else 'unknown',
+            error_info['timestamp']
         )
         
         # TODO: Implement actual notification (email, Slack, PagerDuty, etc.)
@@ -312,20 +551,54 @@ class ErrorHandler:
         Get summary of all errors
         
         Returns:
-            Error summary statistics
+            Error summary statistics (counts cover every handled error, 'errors'
+            lists the most recent ones kept in error_log, 'audit_records_dropped'
+            counts failed-state audit rows that could not be written)
         """
-        total_errors = len(self.error_log)
-        recoverable = sum(1 for e in self.error_log if e.get('recoverable', True))
-        unrecoverable = total_errors - recoverable
-        
         return {
-            'total_errors': total_errors,
-            'recoverable': recoverable,
-            'unrecoverable': unrecoverable,
-            'errors': self.error_log
+            'total_errors': self._total_errors,
+            'recoverable': self._recoverable_errors,
+            'unrecoverable': self._total_errors - self._recoverable_errors,
+            'audit_records_dropped': self._dropped_audit_records,
+            'errors': list(self.error_log)
         }
 
 
-# Create singleton instance
-error_handler = ErrorHandler()
+# Handlers with queued audit rows, flushed once more at interpreter exit
+_audit_handlers: 'weakref.WeakSet[ErrorHandler]' = weakref.WeakSet()
+
+
+def _flush_audit_logs_at_exit():
+    """Write audit rows still queued in any handler"""
+    for handler in list(_audit_handlers):
+        try:
+            handler.flush_audit_log()
+        except Exception as e:
+            logger.error("Audit log flush at exit failed: %s", e)
+
+
+atexit.register(_flush_audit_logs_at_exit)
+
+
+# Singleton instances, created on first access (see __getattr__)
+_instances: Dict[str, Any] = {}
+_instances_lock = threading.Lock()
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Create the error_handler singleton lazily
+    
+    Args:
+        name: Module attribute being looked up
+        
+    Returns:
+        The singleton instance
+    """
+    if name != 'error_handler':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = ErrorHandler()
+        return _instances[name]
 
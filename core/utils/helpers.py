@@ -1,9 +1,11 @@
 """
 Helper utilities for common operations
 """
-import uuid
-from datetime import datetime
+import time
+from secrets import token_hex
+from datetime import datetime, timezone
 from typing import Any, Dict, Optional
+from functools import lru_cache
 import hashlib
 import json
 
@@ -18,9 +20,31 @@ def generate_invoice_id(prefix: str = "INV") -> str:
     Returns:
         Unique invoice ID
     """
-    timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-    unique_id = str(uuid.uuid4())[:8]
-    return f"{prefix}-{timestamp}-{unique_id}"
+    timestamp = time.strftime('%Y%m%d%H%M%S', time.gmtime())
+    return f"{prefix}-{timestamp}-{token_hex(4)}"
+
+
+# (epoch second, ISO string) for utc_now_iso
+_utc_iso_cache = (0, '')
+
+
+def utc_now_iso() -> str:
+    """
+    Get the current UTC time as an ISO 8601 string at one-second resolution
+    
+    The formatted string is rebuilt only when the second changes.
+    
+    Returns:
+        Naive UTC ISO timestamp (same format as datetime.utcnow().isoformat()
+        without microseconds)
+    """
+    global _utc_iso_cache
+    now = int(time.time())
+    cached_second, cached_iso = _utc_iso_cache
+    if now != cached_second:
+        cached_iso = datetime.fromtimestamp(now, timezone.utc).replace(tzinfo=None).isoformat()
+        _utc_iso_cache = (now, cached_iso)
+    return cached_iso
 
 
 def generate_checkpoint_id(invoice_id: str) -> str:
@@ -42,11 +66,26 @@ def calculate_hash(data: Any) -> str:
     Calculate SHA256 hash of data
     
     Args:
-        data: Data to hash (will be JSON serialized)
+        data: Data to hash (will be JSON serialized with sorted keys, so a
+            str is hashed as its quoted JSON form)
         
     Returns:
         Hex digest of hash
     """
+    if isinstance(data, dict) and data and all(isinstance(key, str) for key in data):
+        # Feed the canonical JSON to the hasher one top-level member at a time, so the
+        # full document is never materialized. Produces exactly json.dumps' bytes.
+        hasher = hashlib.sha256()
+        separator = b'{'
+        for key in sorted(data):
+            hasher.update(separator)
+            hasher.update(json.dumps(key).encode())
+            hasher.update(b': ')
+            hasher.update(json.dumps(data[key], sort_keys=True, default=str).encode())
+            separator = b', '
+        hasher.update(b'}')
+        return hasher.hexdigest()
+    
     json_str = json.dumps(data, sort_keys=True, default=str)
     return hashlib.sha256(json_str.encode()).hexdigest()
 
@@ -86,6 +125,13 @@ def is_within_tolerance(
     return min_val <= value <= max_val
 
 
+# (prefix, suffix) per currency code; any other code is rendered as a suffix
+# ("-12.35 EUR"), which keeps the sign in front of the number
+CURRENCY_FORMATS = {
+    'USD': ('$', '')
+}
+
+
 def format_currency(amount: float, currency: str = "USD") -> str:
     """
     Format amount as currency
@@ -97,14 +143,35 @@ def format_currency(amount: float, currency: str = "USD") -> str:
     Returns:
         Formatted currency string
     """
-    if currency == "USD":
-        return f"${amount:,.2f}"
-    return f"{amount:,.2f} {currency}"
+    # Amounts are rounded to cents so equal displayed values share a cache entry;
+    # adding 0.0 turns -0.0 into 0.0, which hash alike but format differently
+    return _format_currency(round(amount, 2) + 0.0, currency)
+
+
+@lru_cache(maxsize=1024)
+def _format_currency(amount: float, currency: str) -> str:
+    """Cached implementation of format_currency"""
+    prefix, suffix = CURRENCY_FORMATS.get(currency) or ('', f' {currency}')
+    return f"{prefix}{amount:,.2f}{suffix}"
+
 
+# Date formats accepted by parse_date, tried in order
+DATE_FORMATS = (
+    '%Y-%m-%d',
+    '%m/%d/%Y',
+    '%d/%m/%Y',
+    '%Y/%m/%d',
+    '%d-%m-%Y',
+    '%m-%d-%Y',
+    '%B %d, %Y',
+    '%d %B %Y'
+)
 
+
+@lru_cache(maxsize=1024)
 def parse_date(date_str: str) -> Optional[datetime]:
     """
-    Parse date string in various formats
+    Parse date string in various formats (results are cached per string)
     
     Args:
         date_str: Date string
@@ -112,18 +179,14 @@ def parse_date(date_str: str) -> Optional[datetime]:
     Returns:
         Datetime object or None if parsing fails
     """
-    formats = [
-        '%Y-%m-%d',
-        '%m/%d/%Y',
-        '%d/%m/%Y',
-        '%Y/%m/%d',
-        '%d-%m-%Y',
-        '%m-%d-%Y',
-        '%B %d, %Y',
-        '%d %B %Y'
-    ]
+    # Fast path for the common zero-padded YYYY-MM-DD form (C parser, no format spec)
+    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-' and date_str[:4].isdigit():
+        try:
+            return datetime.fromisoformat(date_str)
+        except ValueError:
+            pass
     
-    for fmt in formats:
+    for fmt in DATE_FORMATS:
         try:
             return datetime.strptime(date_str, fmt)
         except ValueError:
@@ -132,6 +195,10 @@ def parse_date(date_str: str) -> Optional[datetime]:
     return None
 
 
+# Characters not allowed in filenames, mapped to '_'
+INVALID_FILENAME_CHARS = str.maketrans({char: '_' for char in '<>:"/\\|?*'})
+
+
 def sanitize_filename(filename: str) -> str:
     """
     Sanitize filename by removing invalid characters
@@ -142,12 +209,8 @@ def sanitize_filename(filename: str) -> str:
     Returns:
         Sanitized filename
     """
-    import re
-    # Remove invalid characters
-    sanitized = re.sub(r'[<>:"/\\|?*]', '_', filename)
-    # Remove leading/trailing spaces and dots
-    sanitized = sanitized.strip('. ')
-    return sanitized
+    # Replace invalid characters, then remove leading/trailing spaces and dots
+    return filename.translate(INVALID_FILENAME_CHARS).strip('. ')
 
 
 def truncate_text(text: str, max_length: int = 100, suffix: str = "...") -> str:
@@ -1,10 +1,12 @@
 """
 Logging configuration for the invoice processing system
 """
-import logging
 import sys
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from pathlib import Path
-from datetime import datetime
 
 
 def setup_logging(
@@ -15,11 +17,29 @@ def setup_logging(
     """
     Configure logging for the application
     
+    Records are put on a queue and written to stdout and the log file by a
+    background QueueListener, so logging calls never block on I/O. Like
+    logging.basicConfig, this does nothing if the root logger already has
+    handlers.
+    
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-        log_file: Optional log file path
+        log_file: Optional log file path (rotated at midnight, 14 kept)
         log_format: Optional custom log format
     """
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    
+    # Set specific loggers to WARNING to reduce noise
+    logging.getLogger('urllib3').setLevel(logging.WARNING)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    logging.getLogger('httpcore').setLevel(logging.WARNING)
+    
+    # Hide Uvicorn HTTP request logs for cleaner demo output
+    logging.getLogger('uvicorn.access').setLevel(logging.WARNING)
+    logging.getLogger('uvicorn.error').setLevel(logging.WARNING)
+    
     if log_format is None:
         # Cleaner format for demo - just level and message
         log_format = '%(levelname)s: %(message)s'
@@ -29,24 +49,21 @@ def setup_logging(
         log_path = Path(log_file)
         log_path.parent.mkdir(parents=True, exist_ok=True)
     
-    # Configure root logger
-    logging.basicConfig(
-        level=getattr(logging, log_level.upper()),
-        format=log_format,
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-            *([logging.FileHandler(log_file)] if log_file else [])
-        ]
-    )
+    formatter = logging.Formatter(log_format)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(TimedRotatingFileHandler(log_file, when='midnight', backupCount=14))
+    for handler in handlers:
+        handler.setFormatter(formatter)
     
-    # Set specific loggers to WARNING to reduce noise
-    logging.getLogger('urllib3').setLevel(logging.WARNING)
-    logging.getLogger('httpx').setLevel(logging.WARNING)
-    logging.getLogger('httpcore').setLevel(logging.WARNING)
+    # Configure root logger to hand records off to the listener thread
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
     
-    # Hide Uvicorn HTTP request logs for cleaner demo output
-    logging.getLogger('uvicorn.access').setLevel(logging.WARNING)
-    logging.getLogger('uvicorn.error').setLevel(logging.WARNING)
+    root.setLevel(getattr(logging, log_level.upper()))
+    root.addHandler(QueueHandler(log_queue))
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -65,5 +82,6 @@ def get_logger(name: str) -> logging.Logger:
 # Setup default logging
 setup_logging(
     log_level="INFO",
-    log_file=f"logs/invoice_processing_{datetime.now().strftime('%Y%m%d')}.log"
+    # Dated backups are created by the midnight rotation
+    log_file="logs/invoice_processing.log"
 )
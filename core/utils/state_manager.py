@@ -3,11 +3,18 @@ State management utilities for workflow state operations
 """
 from typing import Dict, Any, Optional
 from datetime import datetime
+from pathlib import Path
 import json
 import copy
+import os
+import pickle
+import threading
 
 from core.models.state import InvoiceState
 
+# Shared encoder for serialize_state, built once instead of per call
+STATE_ENCODER = json.JSONEncoder(indent=2, default=str)
+
 
 class StateManager:
     """
@@ -27,33 +34,40 @@ class StateManager:
         Returns:
             Initial InvoiceState
         """
+        now = datetime.utcnow().isoformat()
         return {
             'invoice_id': invoice_id,
             'file_path': file_path,
             'file_type': file_type,
             'status': 'PENDING',
-            'created_at': datetime.utcnow().isoformat(),
-            'updated_at': datetime.utcnow().isoformat()
+            'created_at': now,
+            'updated_at': now
         }
     
     @staticmethod
     def update_state(
         state: InvoiceState, 
         updates: Dict[str, Any],
-        update_timestamp: bool = True
+        update_timestamp: bool = True,
+        deep: bool = False
     ) -> InvoiceState:
         """
         Update state with new values
         
+        The returned state is a new top-level dict, but nested values (extracted_data,
+        line items, ...) are shared with the input. Treat them as immutable, or pass
+        deep=True if the caller will mutate nested values.
+        
         Args:
             state: Current state
             updates: Dictionary of updates to apply
             update_timestamp: Whether to update the updated_at timestamp
+            deep: Deep-copy the input state instead of sharing nested values
             
         Returns:
             Updated state
         """
-        updated_state = copy.deepcopy(state)
+        updated_state = copy.deepcopy(state) if deep else {**state}
         updated_state.update(updates)
         
         if update_timestamp:
@@ -72,7 +86,7 @@ class StateManager:
         Returns:
             JSON string
         """
-        return json.dumps(state, indent=2, default=str)
+        return STATE_ENCODER.encode(state)
     
     @staticmethod
     def deserialize_state(state_json: str) -> InvoiceState:
@@ -135,6 +149,8 @@ class StateManager:
         """
         Merge multiple state updates into base state
         
+        Like update_state, nested values are shared with the inputs, not copied.
+        
         Args:
             base_state: Base state
             *updates: Variable number of state updates
@@ -142,7 +158,7 @@ class StateManager:
         Returns:
             Merged state
         """
-        merged = copy.deepcopy(base_state)
+        merged = {**base_state}
         
         for update in updates:
             merged.update(update)
@@ -155,10 +171,32 @@ class StateManager:
 class StateSnapshot:
     """
     Create and manage state snapshots for checkpointing
+    
+    Snapshots are stored pickled, which isolates them from later changes to the
+    state and is cheaper than a Python-level deepcopy on save and load. With a
+    storage_dir they are written to disk (fsynced) so they survive a crash;
+    otherwise they are kept in memory. On disk, files are named with the hex
+    encoding of the UTF-8 snapshot ID, so every ID maps to its own file and
+    list_snapshots can recover the IDs exactly.
     """
     
-    def __init__(self):
-        self.snapshots: Dict[str, InvoiceState] = {}
+    SNAPSHOT_SUFFIX = '.pickle'
+    
+    def __init__(self, storage_dir: Optional[str] = None):
+        """
+        Initialize snapshot store
+        
+        Args:
+            storage_dir: Optional directory for on-disk snapshots
+        """
+        self.snapshots: Dict[str, bytes] = {}
+        self.storage_dir = Path(storage_dir) if storage_dir else None
+        if self.storage_dir:
+            self.storage_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _snapshot_path(self, snapshot_id: str) -> Path:
+        """Get the on-disk path for a snapshot"""
+        return self.storage_dir / f"{snapshot_id.encode().hex()}{self.SNAPSHOT_SUFFIX}"
     
     def save_snapshot(self, snapshot_id: str, state: InvoiceState):
         """
@@ -168,7 +206,20 @@ class StateSnapshot:
             snapshot_id: Unique snapshot identifier
             state: State to snapshot
         """
-        self.snapshots[snapshot_id] = copy.deepcopy(state)
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        if self.storage_dir is None:
+            self.snapshots[snapshot_id] = data
+            return
+        
+        # Write to a temp file and rename, so a crash never leaves a partial snapshot
+        path = self._snapshot_path(snapshot_id)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
     
     def load_snapshot(self, snapshot_id: str) -> Optional[InvoiceState]:
         """
@@ -180,7 +231,17 @@ class StateSnapshot:
         Returns:
             Snapshot state or None if not found
         """
-        return copy.deepcopy(self.snapshots.get(snapshot_id))
+        if self.storage_dir is None:
+            snapshot = self.snapshots.get(snapshot_id)
+        else:
+            try:
+                snapshot = self._snapshot_path(snapshot_id).read_bytes()
+            except FileNotFoundError:
+                snapshot = None
+        
+        if snapshot is None:
+            return None
+        return pickle.loads(snapshot)
     
     def delete_snapshot(self, snapshot_id: str):
         """
@@ -189,8 +250,10 @@ class StateSnapshot:
         Args:
             snapshot_id: Snapshot identifier
         """
-        if snapshot_id in self.snapshots:
-            del self.snapshots[snapshot_id]
+        if self.storage_dir is None:
+            self.snapshots.pop(snapshot_id, None)
+        else:
+            self._snapshot_path(snapshot_id).unlink(missing_ok=True)
     
     def list_snapshots(self) -> list:
         """
@@ -199,10 +262,43 @@ class StateSnapshot:
         Returns:
             List of snapshot IDs
         """
-        return list(self.snapshots.keys())
+        if self.storage_dir is None:
+            return list(self.snapshots.keys())
+        
+        snapshot_ids = []
+        for path in self.storage_dir.glob(f"*{self.SNAPSHOT_SUFFIX}"):
+            try:
+                snapshot_ids.append(bytes.fromhex(path.name[:-len(self.SNAPSHOT_SUFFIX)]).decode())
+            except ValueError:
+                # Not a snapshot written by this store
+                continue
+        return snapshot_ids
+
 
+# Singleton instances, created on first access (see __getattr__)
+SINGLETON_FACTORIES = {
+    'state_manager': StateManager,
+    'state_snapshot': StateSnapshot
+}
+_instances: Dict[str, Any] = {}
+_instances_lock = threading.Lock()
 
-# Create singleton instances
-state_manager = StateManager()
-state_snapshot = StateSnapshot()
+
+def __getattr__(name: str) -> Any:
+    """
+    Create the state_manager and state_snapshot singletons lazily
+    
+    Args:
+        name: Module attribute being looked up
+        
+    Returns:
+        The singleton instance
+    """
+    factory = SINGLETON_FACTORIES.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = factory()
+        return _instances[name]
 
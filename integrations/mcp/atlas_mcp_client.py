@@ -2,13 +2,106 @@
 ATLAS MCP Client - Mock Data Only
 Uses sample JSON data from data/samples/
 """
+import copy
 import json
+import hashlib
+from functools import lru_cache
+from itertools import islice
 from pathlib import Path
+from secrets import token_hex
 from typing import Dict, Any, List, Optional
 from core.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Vendor names mapped to IDs (matching sample_po.json) for enrich_vendor
+VENDOR_MAPPING = {
+    "ABC Corporation": "VND-ABC-001",
+    "XYZ Industries": "VND-XYZ-002",
+    "Tech Solutions Inc": "VND-TECH-003"
+}
+
+
+@lru_cache(maxsize=16)
+def _read_mock_file(file_path: str, mtime_ns: int) -> Any:
+    """Parse a mock data file; keyed on mtime so edited files are re-read"""
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+# Email bodies per notification type, as bound str.format_map callables
+EMAIL_TEMPLATES = {
+    'SUCCESS': """
+Invoice Processing Notification
+================================
+
+Invoice Number: {invoice_number}
+Vendor: {vendor}
+Amount: ${amount:,.2f}
+Status: {status}
+
+The invoice has been successfully processed and posted to the ERP system.
+
+---
+Invoice Processing System
+""".format_map,
+    'APPROVAL_NEEDED': """
+Invoice Requires Approval
+==========================
+
+Invoice Number: {invoice_number}
+Vendor: {vendor}
+Amount: ${amount:,.2f}
+
+Reason: {reason}
+
+This invoice requires your approval before processing.
+
+Review URL: http://localhost:8000/review
+
+---
+Invoice Processing System
+""".format_map
+}
+DEFAULT_EMAIL_TEMPLATE = """
+Invoice Processing Notification
+================================
+
+Invoice Number: {invoice_number}
+Vendor: {vendor}
+Amount: ${amount:,.2f}
+Status: {status}
+Type: {notification_type}
+
+---
+Invoice Processing System
+""".format_map
+
+
+@lru_cache(maxsize=256)
+def _mock_vendor_record(vendor_name: str) -> Dict[str, Any]:
+    """Build the mock enrichment record for a vendor (cached, do not mutate)"""
+    # Get vendor ID from mapping or generate one
+    vendor_id = VENDOR_MAPPING.get(vendor_name)
+    if not vendor_id:
+        vendor_id = "VND-" + hashlib.blake2b(vendor_name.encode(), digest_size=4).hexdigest().upper()
+    
+    # Both parts come from one hash: low bits for the prefix, high bits for the serial
+    name_hash = hash(vendor_name) & 0xFFFFFFFFFFFFFFFF
+    tax_id = f"{name_hash % 90 + 10}-{(name_hash >> 32) % 9000000 + 1000000}"
+    
+    return {
+        'vendor_id': vendor_id,
+        'vendor_name': vendor_name,
+        'tax_id': tax_id,
+        'credit_score': 750,
+        'risk_score': 0.15,
+        'payment_terms': 'Net 30',
+        'is_approved_vendor': True,
+        'credit_limit': 50000.00,
+        'enrichment_source': 'mock_vendor_db'
+    }
+
 
 class RealATLASMCPClient:
     """
@@ -20,18 +113,35 @@ class RealATLASMCPClient:
     def __init__(self):
         """Initialize ATLAS MCP client with mock data"""
         self.sample_data_dir = Path("data/samples")
-        logger.info(f"Initializing ATLAS MCP Client (Mock Mode)")
-        logger.info(f"Using sample data from {self.sample_data_dir}")
+        # SendGrid client is created on first use and reused across notifications
+        self._sendgrid_client = None
+        self._sendgrid_api_key = None
+        logger.info("Initializing ATLAS MCP Client (Mock Mode)")
+        logger.info("Using sample data from %s", self.sample_data_dir)
+    
+    def _get_sendgrid_client(self, api_key: str):
+        """Get SendGrid client, reusing the existing one for the same API key"""
+        if self._sendgrid_client is None or self._sendgrid_api_key != api_key:
+            from sendgrid import SendGridAPIClient
+            self._sendgrid_client = SendGridAPIClient(api_key)
+            self._sendgrid_api_key = api_key
+        return self._sendgrid_client
     
     def _load_mock_data(self, filename: str) -> Any:
-        """Load mock data from JSON file"""
+        """
+        Load mock data from JSON file
+        
+        The parsed file is cached; each call gets its own copy, so callers
+        may modify the POs and GRNs they get back.
+        """
         file_path = self.sample_data_dir / filename
-        if not file_path.exists():
-            logger.error(f"Mock data file not found: {file_path}")
+        try:
+            mtime_ns = file_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            logger.error("Mock data file not found: %s", file_path)
             return None
         
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        return copy.deepcopy(_read_mock_file(str(file_path), mtime_ns))
     
     def fetch_po(self, vendor_id: str = None, vendor_name: str = None, amount: float = None) -> List[Dict[str, Any]]:
         """
@@ -48,8 +158,11 @@ class RealATLASMCPClient:
         logger.info("=" * 60)
         logger.info("ATLAS MCP - Fetching Purchase Orders")
         logger.info("=" * 60)
-        logger.info(f"Vendor: {vendor_name or vendor_id}")
-        logger.info(f"Amount: ${amount}" if amount else "Amount: Any")
+        logger.info("Vendor: %s", vendor_name or vendor_id)
+        if amount:
+            logger.info("Amount: $%s", amount)
+        else:
+            logger.info("Amount: Any")
         
         # Use mock data
         logger.info("Using mock data")
@@ -60,7 +173,7 @@ class RealATLASMCPClient:
         
         # Filter by vendor
         if vendor_name and po_data.get('vendor_name') != vendor_name:
-            logger.info(f"No PO found for vendor: {vendor_name}")
+            logger.info("No PO found for vendor: %s", vendor_name)
             return []
         
         # Filter by amount (with 10% tolerance)
@@ -68,10 +181,10 @@ class RealATLASMCPClient:
             po_amount = po_data.get('total_amount', 0)
             tolerance = amount * 0.1
             if abs(po_amount - amount) > tolerance:
-                logger.info(f"PO amount ${po_amount} doesn't match invoice ${amount}")
+                logger.info("PO amount $%s doesn't match invoice $%s", po_amount, amount)
                 return []
             
-        logger.info(f"Found PO: {po_data.get('po_number')}")
+        logger.info("Found PO: %s", po_data.get('po_number'))
         logger.info("=" * 60)
         return [po_data]
     
@@ -90,7 +203,7 @@ class RealATLASMCPClient:
         logger.info("=" * 60)
         logger.info("ATLAS MCP - Fetching Goods Receipt Notes")
         logger.info("=" * 60)
-        logger.info(f"PO Number: {po_number}" if po_number else "PO Number: Any")
+        logger.info("PO Number: %s", po_number or "Any")
         
         # Use mock data
         logger.info("Using mock data")
@@ -101,10 +214,10 @@ class RealATLASMCPClient:
         
         # Filter by PO number
         if po_number and grn_data.get('po_number') != po_number:
-            logger.info(f"No GRN found for PO: {po_number}")
+            logger.info("No GRN found for PO: %s", po_number)
             return []
         
-        logger.info(f"Found GRN: {grn_data.get('grn_number')}")
+        logger.info("Found GRN: %s", grn_data.get('grn_number'))
         logger.info("=" * 60)
         return [grn_data]
     
@@ -124,8 +237,8 @@ class RealATLASMCPClient:
         logger.info("=" * 60)
         logger.info("ATLAS MCP - Fetching Historical Invoices")
         logger.info("=" * 60)
-        logger.info(f"Vendor: {vendor_name or vendor_id}")
-        logger.info(f"Limit: {limit}")
+        logger.info("Vendor: %s", vendor_name or vendor_id)
+        logger.info("Limit: %s", limit)
         
         # Always use mock data
         logger.info("Using mock data")
@@ -134,17 +247,55 @@ class RealATLASMCPClient:
         if not history_data:
             return []
         
-            # Filter by vendor
+        # Filter by vendor, stopping once limit matches are collected
         if vendor_name:
-            history_data = [inv for inv in history_data if inv.get('vendor_name') == vendor_name]
-        
-            # Limit results
-        history_data = history_data[:limit]
+            history_data = list(islice(
+                (inv for inv in history_data if inv.get('vendor_name') == vendor_name),
+                limit
+            ))
+        else:
+            history_data = history_data[:limit]
         
-        logger.info(f"Found {len(history_data)} historical invoices")
+        logger.info("Found %d historical invoices", len(history_data))
         logger.info("=" * 60)
         return history_data
     
+    def fetch_bundle(
+        self,
+        vendor_id: str = None,
+        vendor_name: str = None,
+        amount: float = None,
+        po_number: str = None,
+        history_limit: int = 10
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Fetch POs, GRNs and historical invoices in a single call
+        
+        ATLAS MCP Tool: fetch_bundle
+        
+        Args:
+            vendor_id: Vendor ID
+            vendor_name: Vendor name
+            amount: Amount to match POs against
+            po_number: PO number for GRN lookup
+            history_limit: Max historical invoices
+            
+        Returns:
+            Dictionary with 'pos', 'grns' and 'history' lists
+        """
+        logger.info("ATLAS MCP - Fetching PO/GRN/History bundle")
+        
+        # Mock mode composes the bundle locally; a real ATLAS server answers it as one request
+        return {
+            'pos': self.fetch_po(vendor_id=vendor_id, vendor_name=vendor_name, amount=amount),
+            'grns': self.fetch_grn(po_number=po_number, vendor_id=vendor_id),
+            'history': self.fetch_history(
+                vendor_id=vendor_id,
+                vendor_name=vendor_name,
+                limit=history_limit
+            )
+        }
+    
     def enrich_vendor(self, vendor_name: str) -> Dict[str, Any]:
         """
         Enrich vendor data with external information
@@ -160,39 +311,15 @@ class RealATLASMCPClient:
         logger.info("=" * 60)
         logger.info("ATLAS MCP - Enriching Vendor Data")
         logger.info("=" * 60)
-        logger.info(f"Vendor: {vendor_name}")
+        logger.info("Vendor: %s", vendor_name)
         
         # Use mock enrichment data
         logger.info("Using mock enrichment data")
         
-        # Map vendor names to IDs (matching sample_po.json)
-        vendor_mapping = {
-            "ABC Corporation": "VND-ABC-001",
-            "XYZ Industries": "VND-XYZ-002",
-            "Tech Solutions Inc": "VND-TECH-003"
-        }
-        
-        # Get vendor ID from mapping or generate one
-        vendor_id = vendor_mapping.get(vendor_name)
-        if not vendor_id:
-            import hashlib
-            vendor_id = "VND-" + hashlib.md5(vendor_name.encode()).hexdigest()[:8].upper()
-        
-        tax_id = f"{hash(vendor_name) % 90 + 10}-{hash(vendor_name[::-1]) % 9000000 + 1000000}"
-        
-        enriched_data = {
-            'vendor_id': vendor_id,
-            'vendor_name': vendor_name,
-            'tax_id': tax_id,
-            'credit_score': 750,
-            'risk_score': 0.15,
-            'payment_terms': 'Net 30',
-            'is_approved_vendor': True,
-            'credit_limit': 50000.00,
-            'enrichment_source': 'mock_vendor_db'
-        }
+        # The record is cached per vendor; callers get their own copy to put in state
+        enriched_data = dict(_mock_vendor_record(vendor_name))
         
-        logger.info(f"Enriched vendor: {vendor_id}")
+        logger.info("Enriched vendor: %s", enriched_data['vendor_id'])
         logger.info("=" * 60)
         return enriched_data
     
@@ -206,7 +333,7 @@ class RealATLASMCPClient:
             logger.info("=" * 60)
             return result
         except Exception as e:
-            logger.error(f"MCP call failed: {e}")
+            logger.error("MCP call failed: %s", e)
             logger.warning("Falling back to mock data")
             return self.enrich_vendor(vendor_name)
     
@@ -226,23 +353,22 @@ class RealATLASMCPClient:
         logger.info("=" * 60)
         logger.info("ATLAS MCP - Posting to ERP")
         logger.info("=" * 60)
-        logger.info(f"Invoice: {invoice_data.get('invoice_id')}")
-        logger.info(f"Amount: ${invoice_data.get('total_amount')}")
-        logger.info(f"Entries: {len(accounting_entries)}")
+        logger.info("Invoice: %s", invoice_data.get('invoice_id'))
+        logger.info("Amount: $%s", invoice_data.get('total_amount'))
+        logger.info("Entries: %d", len(accounting_entries))
         
         # Always use mock data
         logger.info("Using mock ERP posting")
-        import uuid
         
         result = {
             'posted': True,
-            'erp_txn_id': f"ERP-TXN-{uuid.uuid4().hex[:8].upper()}",
-            'scheduled_payment_id': f"PAY-{uuid.uuid4().hex[:8].upper()}",
+            'erp_txn_id': f"ERP-TXN-{token_hex(4).upper()}",
+            'scheduled_payment_id': f"PAY-{token_hex(4).upper()}",
             'posted_at': '2025-12-07T10:54:00Z',
             'erp_system': 'mock_erp'
         }
         
-        logger.info(f"Posted successfully: {result['erp_txn_id']}")
+        logger.info("Posted successfully: %s", result['erp_txn_id'])
         logger.info("=" * 60)
         return result
         
@@ -256,7 +382,7 @@ class RealATLASMCPClient:
             logger.info("=" * 60)
             return result
         except Exception as e:
-            logger.error(f"MCP call failed: {e}")
+            logger.error("MCP call failed: %s", e)
             logger.warning("Falling back to mock posting")
             return self.post_to_erp(invoice_data, accounting_entries)
     
@@ -277,8 +403,8 @@ class RealATLASMCPClient:
         logger.info("=" * 60)
         logger.info("ATLAS MCP - Sending Notifications")
         logger.info("=" * 60)
-        logger.info(f"Type: {notification_type}")
-        logger.info(f"Recipients: {len(recipients)}")
+        logger.info("Type: %s", notification_type)
+        logger.info("Recipients: %d", len(recipients))
         
         # Try to use real SendGrid
         import os
@@ -286,7 +412,6 @@ class RealATLASMCPClient:
         
         if sendgrid_api_key and sendgrid_api_key.startswith('SG.'):
             try:
-                from sendgrid import SendGridAPIClient
                 from sendgrid.helpers.mail import Mail, Email, To, Content
                 
                 logger.info("Using real SendGrid service")
@@ -306,18 +431,21 @@ class RealATLASMCPClient:
                 else:
                     body = self._build_email_body(notification_type, data)
                 
-                # Send to each recipient
+                # Send to all recipients in one request
                 notification_ids = []
                 
                 try:
-                    sg = SendGridAPIClient(sendgrid_api_key)
-                    
-                    for recipient in recipients:
+                    if recipients:
+                        sg = self._get_sendgrid_client(sendgrid_api_key)
+                        
+                        # is_multiple gives each recipient their own personalization,
+                        # so everyone still receives a separate copy of the email
                         message = Mail(
                             from_email=Email(from_email, from_name),
-                            to_emails=To(recipient),
+                            to_emails=[To(recipient) for recipient in recipients],
                             subject=subject,
-                            plain_text_content=Content("text/plain", body)
+                            plain_text_content=Content("text/plain", body),
+                            is_multiple=True
                         )
                         
                         # Disable click tracking to preserve original URLs
@@ -327,17 +455,22 @@ class RealATLASMCPClient:
                         
                         response = sg.send(message)
                         
-                        # Get message ID safely
+                        # Get message ID safely (SendGrid returns one ID per request)
                         try:
-                            msg_id = str(response.headers.get('X-Message-Id', f'NOTIF-{len(notification_ids)+1:03d}'))
+                            msg_id = response.headers.get('X-Message-Id')
                         except:
-                            msg_id = f'NOTIF-{len(notification_ids)+1:03d}'
+                            msg_id = None
                         
-                        notification_ids.append(msg_id)
-                        logger.info(f"Email sent to {recipient}: Status {response.status_code}")
+                        if msg_id:
+                            notification_ids = [str(msg_id)] * len(recipients)
+                        else:
+                            notification_ids = list(map('NOTIF-{:03d}'.format, range(1, len(recipients) + 1)))
+                        logger.info(
+                            "Email sent to %d recipient(s): Status %s", len(recipients), response.status_code
+                        )
                         
                 except Exception as e:
-                    logger.error(f"SendGrid error: {str(e)}")
+                    logger.error("SendGrid error: %s", e)
                     raise
                 
                 result = {
@@ -347,12 +480,12 @@ class RealATLASMCPClient:
                     'service': 'sendgrid'
                 }
                 
-                logger.info(f"Notifications sent via SendGrid: {len(recipients)}")
+                logger.info("Notifications sent via SendGrid: %d", len(recipients))
                 logger.info("=" * 60)
                 return result
                 
             except Exception as e:
-                logger.error(f"SendGrid failed: {e}")
+                logger.error("SendGrid failed: %s", e)
                 logger.warning("Falling back to mock notifications")
         
         # Fallback to mock
@@ -360,70 +493,26 @@ class RealATLASMCPClient:
         
         result = {
             'sent': True,
-            'notification_ids': [f"NOTIF-{i+1:03d}" for i in range(len(recipients))],
+            'notification_ids': list(map('NOTIF-{:03d}'.format, range(1, len(recipients) + 1))),
             'recipients_count': len(recipients),
             'service': 'mock_sendgrid'
         }
         
-        logger.info(f"Mock notifications sent: {len(recipients)}")
+        logger.info("Mock notifications sent: %d", len(recipients))
         logger.info("=" * 60)
         return result
     
     def _build_email_body(self, notification_type: str, data: Dict[str, Any]) -> str:
         """Build email body based on notification type"""
-        invoice_number = data.get('invoice_number', 'N/A')
-        vendor = data.get('vendor_name', 'N/A')
-        amount = data.get('total_amount', 0)
-        status = data.get('status', 'N/A')
-        
-        if notification_type == 'SUCCESS':
-            return f"""
-Invoice Processing Notification
-================================
-
-Invoice Number: {invoice_number}
-Vendor: {vendor}
-Amount: ${amount:,.2f}
-Status: {status}
-
-The invoice has been successfully processed and posted to the ERP system.
-
----
-Invoice Processing System
-"""
-        elif notification_type == 'APPROVAL_NEEDED':
-            reason = data.get('reason', 'Manual review required')
-            return f"""
-Invoice Requires Approval
-==========================
-
-Invoice Number: {invoice_number}
-Vendor: {vendor}
-Amount: ${amount:,.2f}
-
-Reason: {reason}
-
-This invoice requires your approval before processing.
-
-Review URL: http://localhost:8000/review
-
----
-Invoice Processing System
-"""
-        else:
-            return f"""
-Invoice Processing Notification
-================================
-
-Invoice Number: {invoice_number}
-Vendor: {vendor}
-Amount: ${amount:,.2f}
-Status: {status}
-Type: {notification_type}
-
----
-Invoice Processing System
-"""
+        fields = {
+            'invoice_number': data.get('invoice_number', 'N/A'),
+            'vendor': data.get('vendor_name', 'N/A'),
+            'amount': data.get('total_amount', 0),
+            'status': data.get('status', 'N/A'),
+            'reason': data.get('reason', 'Manual review required'),
+            'notification_type': notification_type
+        }
+        return EMAIL_TEMPLATES.get(notification_type, DEFAULT_EMAIL_TEMPLATE)(fields)
         
         try:
             logger.info("Calling real ATLAS MCP server")
@@ -436,7 +525,7 @@ Invoice Processing System
             logger.info("=" * 60)
             return result
         except Exception as e:
-            logger.error(f"MCP call failed: {e}")
+            logger.error("MCP call failed: %s", e)
             logger.warning("Falling back to mock notifications")
             return self.send_notification(notification_type, recipients, data)
     
@@ -455,7 +544,7 @@ Invoice Processing System
         logger.info("=" * 60)
         logger.info("ATLAS MCP - Fetching Human Decision")
         logger.info("=" * 60)
-        logger.info(f"Checkpoint ID: {checkpoint_id}")
+        logger.info("Checkpoint ID: %s", checkpoint_id)
         
         # This always uses local DB (not truly external)
         # But routing through ATLAS MCP as per spec
@@ -463,7 +552,13 @@ Invoice Processing System
         
         session = get_session()
         try:
-            checkpoint = session.query(Checkpoint).filter(
+            # Only the decision columns are loaded, not the full checkpoint row
+            checkpoint = session.query(
+                Checkpoint.human_decision,
+                Checkpoint.reviewer_id,
+                Checkpoint.review_notes,
+                Checkpoint.reviewed_at
+            ).filter(
                 Checkpoint.hitl_checkpoint_id == checkpoint_id
             ).first()
             
@@ -474,7 +569,7 @@ Invoice Processing System
                     'review_notes': checkpoint.review_notes,
                     'reviewed_at': checkpoint.reviewed_at.isoformat() if checkpoint.reviewed_at else None
                 }
-                logger.info(f"Decision found: {result['decision']}")
+                logger.info("Decision found: %s", result['decision'])
                 logger.info("=" * 60)
                 return result
             else:
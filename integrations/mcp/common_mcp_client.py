@@ -13,12 +13,42 @@ Tools provided:
 """
 
 import re
+from functools import lru_cache
 from typing import Dict, Any, List
-from datetime import datetime
+from core.utils.helpers import utc_now_iso
 from core.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# All parse_invoice_data fields in one alternation, so the text is scanned once
+# Subtotal precedes Total so a "Subtotal" label is not also read as the total
+INVOICE_FIELDS_PATTERN = re.compile(
+    r'Vendor[:\s]+(?P<vendor>[A-Za-z\s&.,]+?)(?:\n|$)'  # Stop at newline
+    r'|From[:\s]+(?P<from_vendor>[A-Za-z\s&.,]+?)(?:\n|$)'
+    r'|Bill\s+To[:\s]+(?P<bill_to_vendor>[A-Za-z\s&.,]+?)(?:\n|$)'
+    r'|Invoice\s+Number[:\s]+(?P<invoice_number>[A-Z0-9-]+)'
+    r'|Invoice\s+Date[:\s]+(?P<invoice_date>[0-9]{4}-[0-9]{2}-[0-9]{2})'
+    r'|Due\s+Date[:\s]+(?P<due_date>[0-9]{4}-[0-9]{2}-[0-9]{2})'
+    r'|Subtotal[:\s]+\$(?P<subtotal>[0-9,]+\.?\d{0,2})'
+    r'|Total[:\s]+\$(?P<total_amount>[0-9,]+\.?\d{0,2})'
+    r'|Tax[:\s]+\$(?P<tax_amount>[0-9,]+\.?\d{0,2})',
+    re.IGNORECASE
+)
+# Fields that validate_schema requires to be present and non-empty
+REQUIRED_FIELDS = ('vendor_name', 'invoice_number', 'total_amount')
+
+# Vendor name abbreviations expanded by normalize_vendor (case preserved)
+VENDOR_ABBREVIATIONS = {
+    'Corp.': 'Corporation',
+    'Inc.': 'Incorporated',
+    'Ltd.': 'Limited'
+}
+VENDOR_ABBREVIATION_PATTERN = re.compile('|'.join(re.escape(abbr) for abbr in VENDOR_ABBREVIATIONS))
+# Vendor labels in priority order
+VENDOR_GROUPS = ('vendor', 'from_vendor', 'bill_to_vendor')
+TEXT_FIELDS = ('invoice_number', 'invoice_date', 'due_date')
+AMOUNT_FIELDS = ('total_amount', 'subtotal', 'tax_amount')
+
 
 class CommonMCPClient:
     """
@@ -48,51 +78,30 @@ class CommonMCPClient:
         logger.info("COMMON MCP - Parsing Invoice Data")
         logger.info("=" * 60)
         
+        # First occurrence of each field, from a single scan
+        found = {}
+        for match in INVOICE_FIELDS_PATTERN.finditer(text):
+            found.setdefault(match.lastgroup, match.group(match.lastgroup))
+        
         data = {}
         
         # Extract vendor name
-        vendor_patterns = [
-            r'Vendor[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',  # Stop at newline
-            r'From[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)',
-            r'Bill\s+To[:\s]+([A-Za-z\s&.,]+?)(?:\n|$)'
-        ]
-        
-        for pattern in vendor_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                data['vendor_name'] = match.group(1).strip()
+        for group in VENDOR_GROUPS:
+            if group in found:
+                data['vendor_name'] = found[group].strip()
                 break
         
-        # Extract invoice number
-        inv_num_match = re.search(r'Invoice\s+Number[:\s]+([A-Z0-9-]+)', text, re.IGNORECASE)
-        if inv_num_match:
-            data['invoice_number'] = inv_num_match.group(1).strip()
-        
-        # Extract dates
-        date_match = re.search(r'Invoice\s+Date[:\s]+([0-9]{4}-[0-9]{2}-[0-9]{2})', text, re.IGNORECASE)
-        if date_match:
-            data['invoice_date'] = date_match.group(1).strip()
-        
-        due_match = re.search(r'Due\s+Date[:\s]+([0-9]{4}-[0-9]{2}-[0-9]{2})', text, re.IGNORECASE)
-        if due_match:
-            data['due_date'] = due_match.group(1).strip()
-        
-        # Extract total
-        total_match = re.search(r'Total[:\s]+\$([0-9,]+\.?\d{0,2})', text, re.IGNORECASE)
-        if total_match:
-            data['total_amount'] = float(total_match.group(1).replace(',', ''))
-        
-        # Extract subtotal
-        subtotal_match = re.search(r'Subtotal[:\s]+\$([0-9,]+\.?\d{0,2})', text, re.IGNORECASE)
-        if subtotal_match:
-            data['subtotal'] = float(subtotal_match.group(1).replace(',', ''))
+        # Extract invoice number and dates
+        for field in TEXT_FIELDS:
+            if field in found:
+                data[field] = found[field].strip()
         
-        # Extract tax
-        tax_match = re.search(r'Tax[:\s]+\$([0-9,]+\.?\d{0,2})', text, re.IGNORECASE)
-        if tax_match:
-            data['tax_amount'] = float(tax_match.group(1).replace(',', ''))
+        # Extract total, subtotal and tax
+        for field in AMOUNT_FIELDS:
+            if field in found:
+                data[field] = float(found[field].replace(',', ''))
         
-        logger.info(f"Parsed fields: {list(data.keys())}")
+        logger.info("Parsed fields: %s", list(data.keys()))
         logger.info("=" * 60)
         
         return data
@@ -112,21 +121,9 @@ class CommonMCPClient:
         if not vendor_name:
             return ""
         
-        # Remove extra whitespace
-        normalized = ' '.join(vendor_name.split())
+        normalized = _normalize_vendor_name(vendor_name)
         
-        # Common abbreviations (preserve case)
-        replacements = {
-            'Corp.': 'Corporation',
-            'Inc.': 'Incorporated',
-            'Ltd.': 'Limited',
-            'LLC': 'LLC'
-        }
-        
-        for old, new in replacements.items():
-            normalized = normalized.replace(old, new)
-        
-        logger.info(f"Normalized vendor: '{vendor_name}' → '{normalized}'")
+        logger.info("Normalized vendor: '%s' → '%s'", vendor_name, normalized)
         return normalized
     
     def compute_match_score(
@@ -159,8 +156,8 @@ class CommonMCPClient:
         evidence = {}
         
         # Vendor match
-        invoice_vendor = invoice_data.get('vendor_name', '').upper()
-        po_vendor = po_data.get('vendor_name', '').upper()
+        invoice_vendor = (invoice_data.get('vendor_name') or '').upper()
+        po_vendor = (po_data.get('vendor_name') or '').upper()
         vendor_match = invoice_vendor == po_vendor
         if vendor_match:
             score += weights['vendor']
@@ -180,13 +177,12 @@ class CommonMCPClient:
             evidence['amount_diff'] = amount_diff
             evidence['amount_diff_pct'] = diff_pct
         
-        # Line items match
-        matched_items = 0
-        for inv_item in invoice_items:
-            for po_item in po_items:
-                if inv_item.get('description', '').upper() == po_item.get('description', '').upper():
-                    matched_items += 1
-                    break
+        # Line items match: one hashed lookup per invoice item against the PO descriptions
+        po_descriptions = {(po_item.get('description') or '').upper() for po_item in po_items}
+        matched_items = sum(
+            1 for inv_item in invoice_items
+            if (inv_item.get('description') or '').upper() in po_descriptions
+        )
         
         if len(po_items) > 0:
             item_match_pct = matched_items / len(po_items)
@@ -195,10 +191,10 @@ class CommonMCPClient:
             evidence['items_total'] = len(po_items)
             evidence['items_match'] = matched_items == len(po_items)
         
-        logger.info(f"Match Score: {score:.2f}")
-        logger.info(f"Vendor Match: {vendor_match}")
-        logger.info(f"Amount Match: {evidence.get('amount_match', False)}")
-        logger.info(f"Items Matched: {matched_items}/{len(po_items)}")
+        logger.info("Match Score: %.2f", score)
+        logger.info("Vendor Match: %s", vendor_match)
+        logger.info("Amount Match: %s", evidence.get('amount_match', False))
+        logger.info("Items Matched: %d/%d", matched_items, len(po_items))
         logger.info("=" * 60)
         
         return {
@@ -221,19 +217,19 @@ class CommonMCPClient:
         """
         logger.info("COMMON MCP - Validating Schema")
         
-        errors = []
-        required_fields = ['vendor_name', 'invoice_number', 'total_amount']
-        
-        for field in required_fields:
-            if not data.get(field):
-                errors.append(f"Missing required field: {field}")
+        errors = [
+            f"Missing required field: {field}"
+            for field in REQUIRED_FIELDS
+            if not data.get(field)
+        ]
         
         # Validate amount
-        if data.get('total_amount') and data['total_amount'] <= 0:
+        total_amount = data.get('total_amount')
+        if total_amount and total_amount <= 0:
             errors.append("Total amount must be positive")
         
         is_valid = len(errors) == 0
-        logger.info(f"Validation: {'PASSED' if is_valid else 'FAILED'} ({len(errors)} errors)")
+        logger.info("Validation: %s (%d errors)", 'PASSED' if is_valid else 'FAILED', len(errors))
         
         return {
             'is_valid': is_valid,
@@ -260,6 +256,7 @@ class CommonMCPClient:
         logger.info("COMMON MCP - Building Accounting Entries")
         
         amount = invoice_data.get('total_amount', 0)
+        timestamp = utc_now_iso()
         
         entries = [
             {
@@ -267,20 +264,30 @@ class CommonMCPClient:
                 'description': 'Invoice Expense',
                 'debit': amount,
                 'credit': 0,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': timestamp
             },
             {
                 'account': '2000',  # Accounts Payable
                 'description': 'Accounts Payable',
                 'debit': 0,
                 'credit': amount,
-                'timestamp': datetime.utcnow().isoformat()
+                'timestamp': timestamp
             }
         ]
         
-        logger.info(f"Created {len(entries)} accounting entries")
+        logger.info("Created %d accounting entries", len(entries))
         return entries
 
 
+@lru_cache(maxsize=1024)
+def _normalize_vendor_name(vendor_name: str) -> str:
+    """Cached implementation of CommonMCPClient.normalize_vendor"""
+    # Remove extra whitespace
+    normalized = ' '.join(vendor_name.split())
+    
+    # Common abbreviations, expanded in a single pass
+    return VENDOR_ABBREVIATION_PATTERN.sub(lambda m: VENDOR_ABBREVIATIONS[m.group()], normalized)
+
+
 # Create singleton instance
 common_mcp_client = CommonMCPClient()
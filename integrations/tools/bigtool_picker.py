@@ -6,15 +6,24 @@ Supports two selection modes:
 2. YAML-based selection (for other tools) - Uses priority-based selection from tools.yaml
 """
 import os
-import yaml
-from typing import Dict, List, Optional, Any
+import copy
+import json
+import threading
+from itertools import product
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any, Tuple
 from pathlib import Path
-from openai import OpenAI
 from core.config.config import config
 from core.utils.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Default tools configuration, core/config/tools.yaml
+DEFAULT_TOOLS_CONFIG_PATH = Path(__file__).parent.parent.parent / 'core' / 'config' / 'tools.yaml'
+
+# Maximum number of entries in each per-picker cache (select() results, LLM OCR verdicts)
+SELECTION_CACHE_SIZE = 256
+
 
 class BigtoolPicker:
     """
@@ -39,6 +48,51 @@ You always produce clean structured output.
 Your current task: Select the best tool from the available pool based on the given context.
 """
     
+    # OCR tools the LLM chooses between
+    OCR_TOOLS = {
+        "tesseract": {
+            "description": "Fast, lightweight OCR. Best for high-quality printed text.",
+            "strengths": ["Speed", "Printed text", "English", "Low resource"],
+            "weaknesses": ["Handwriting", "Low quality", "Multi-language"]
+        },
+        "easyocr": {
+            "description": "Deep learning OCR. Better for handwriting and low quality.",
+            "strengths": ["Handwriting", "Low quality", "Multi-language"],
+            "weaknesses": ["Slower", "Higher resource usage"]
+        }
+    }
+    
+    # Detailed information for get_tool_info, keyed on (capability, tool name)
+    TOOL_INFO = {
+        ('ocr', 'tesseract'): MappingProxyType({
+            'name': 'Tesseract OCR',
+            'version': '5.x',
+            'type': 'local',
+            'capabilities': ('printed_text', 'english', 'fast'),
+            'config': MappingProxyType({'psm': 6, 'oem': 3})
+        }),
+        ('ocr', 'easyocr'): MappingProxyType({
+            'name': 'EasyOCR',
+            'version': 'latest',
+            'type': 'deep_learning',
+            'capabilities': ('handwriting', 'multi_language', 'low_quality'),
+            'config': MappingProxyType({'gpu': False, 'languages': ('en',)})
+        })
+    }
+    
+    # Rule-based OCR choice keyed on (has_handwriting, low quality, non-English):
+    # EasyOCR when any of them holds, Tesseract otherwise
+    OCR_RULES = {
+        key: 'easyocr' if any(key) else 'tesseract'
+        for key in product((False, True), repeat=3)
+    }
+    
+    # Output token cap for a single OCR verdict; either tool name (even quoted) fits
+    OCR_MAX_TOKENS = 5
+    
+    # Maximum number of invoice contexts sent to the LLM in one batch prompt
+    OCR_BATCH_SIZE = 20
+    
     def __init__(self, tools_config_path: Optional[str] = None):
         """
         Initialize BigtoolPicker with tools configuration and OpenAI client
@@ -48,33 +102,83 @@ Your current task: Select the best tool from the available pool based on the giv
         """
         # Load YAML configuration for non-OCR tools
         if tools_config_path is None:
-            # Point to core/config/tools.yaml
-            project_root = Path(__file__).parent.parent.parent
-            tools_config_path = project_root / 'core' / 'config' / 'tools.yaml'
+            tools_config_path = DEFAULT_TOOLS_CONFIG_PATH
+        
+        # Private copy, so the defaults filled in below can't leak into the shared cache
+        self.config = copy.deepcopy(config.load_tools_config(tools_config_path))
         
-        with open(tools_config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        # Fill in optional tool fields once, so lookups below can index directly
+        for tools in self.config.get('tool_pools', {}).values():
+            for tool in tools or []:
+                tool.setdefault('priority', 999)
+                tool.setdefault('use_cases', [])
+                tool.setdefault('config', {})
         
-        self.tool_pools = self.config.get('tool_pools', {})
+        # Pools are frozen after load: tuples of read-only tool views, sorted by
+        # priority (lower number = higher priority), so selection only filters
+        # and the first tool left is the best one
+        self.tool_pools: Dict[str, Tuple[Mapping[str, Any], ...]] = {
+            capability: tuple(
+                MappingProxyType(tool)
+                for tool in sorted(tools or [], key=lambda x: x['priority'])
+            )
+            for capability, tools in self.config.get('tool_pools', {}).items()
+        }
+        
+        # Per-capability lookup tables: tool name -> position in the sorted pool,
+        # and use case -> tools supporting it (in priority order)
+        self._tool_positions: Dict[str, Dict[str, int]] = {}
+        self._use_case_tools: Dict[str, Dict[str, List[Mapping[str, Any]]]] = {}
+        # Selection result for each tool, built once with env var references
+        # resolved and shared by every select()/get_fallback() call; keyed on id(tool)
+        self._tool_infos: Dict[int, Mapping[str, Any]] = {}
+        for capability, tools in self.tool_pools.items():
+            positions = self._tool_positions[capability] = {}
+            by_use_case = self._use_case_tools[capability] = {}
+            for position, tool in enumerate(tools):
+                positions.setdefault(tool['name'], position)
+                self._tool_infos[id(tool)] = MappingProxyType({
+                    'name': tool['name'],
+                    'config': MappingProxyType(self._resolve_config(tool['config'])),
+                    'priority': tool['priority'],
+                    'use_cases': tuple(tool['use_cases'])
+                })
+                for use_case in tool['use_cases']:
+                    by_use_case.setdefault(use_case, []).append(tool)
+        # select() results keyed on (capability, pool_hint, use_case)
+        self._selection_cache: Dict[Tuple[str, Optional[Tuple[str, ...]], Any], Mapping[str, Any]] = {}
+        self._selection_hits = 0
+        self._selection_misses = 0
+        # LLM OCR verdicts keyed on the prompt built from the invoice context
+        self._ocr_llm_cache: Dict[str, str] = {}
         self.selection_strategy = self.config.get('selection_strategy', {})
         self.fallback_enabled = self.selection_strategy.get('fallback', True)
         self.retry_count = self.selection_strategy.get('retry_count', 2)
         
-        # Initialize OpenAI client for LLM-based OCR selection
+        # OpenAI client for LLM-based OCR selection, created on first use
         self.api_key = os.getenv('OPENAI_API_KEY')
+        self._llm_client = None
+        self._llm_client_lock = threading.Lock()
         if not self.api_key:
             logger.warning("OPENAI_API_KEY not found, LLM OCR selection will fall back to rules")
-            self.llm_client = None
-        else:
-            self.llm_client = OpenAI(api_key=self.api_key)
-            logger.info("LLM Bigtool Picker initialized with OpenAI")
+    
+    @property
+    def llm_client(self):
+        """OpenAI client, or None without an API key (created on first access)"""
+        if self._llm_client is None and self.api_key:
+            with self._llm_client_lock:
+                if self._llm_client is None:
+                    from openai import OpenAI
+                    self._llm_client = OpenAI(api_key=self.api_key)
+                    logger.info("LLM Bigtool Picker initialized with OpenAI")
+        return self._llm_client
     
     def select(
         self, 
         capability: str, 
         context: Optional[Dict[str, Any]] = None,
         pool_hint: Optional[List[str]] = None
-    ) -> Dict[str, Any]:
+    ) -> Mapping[str, Any]:
         """
         Select the best tool for a given capability
         
@@ -84,7 +188,8 @@ Your current task: Select the best tool from the available pool based on the giv
             pool_hint: Optional list of preferred tool names
             
         Returns:
-            Dictionary with selected tool information:
+            Read-only view of the selected tool information, shared between
+            calls (copy with dict() if a mutable version is needed):
             {
                 'name': 'tool_name',
                 'config': {...},
@@ -95,6 +200,28 @@ Your current task: Select the best tool from the available pool based on the giv
         Raises:
             ValueError: If capability not found or no tools available
         """
+        use_case = context.get('use_case') if context else None
+        key = (capability, tuple(pool_hint) if pool_hint else None, use_case)
+        
+        selected = self._selection_cache.get(key)
+        if selected is not None:
+            self._selection_hits += 1
+            return selected
+        
+        self._selection_misses += 1
+        selected = self._select_uncached(capability, pool_hint, use_case)
+        if len(self._selection_cache) >= SELECTION_CACHE_SIZE:
+            self._selection_cache.clear()
+        self._selection_cache[key] = selected
+        return selected
+    
+    def _select_uncached(
+        self,
+        capability: str,
+        pool_hint: Optional[List[str]],
+        use_case: Any
+    ) -> Mapping[str, Any]:
+        """Run the tool selection behind select()"""
         if capability not in self.tool_pools:
             raise ValueError(f"Capability '{capability}' not found in tool pools")
         
@@ -103,51 +230,68 @@ Your current task: Select the best tool from the available pool based on the giv
         if not available_tools:
             raise ValueError(f"No tools available for capability '{capability}'")
         
-        # Filter by pool_hint if provided
+        # Filter by pool_hint if provided (looked up by name, kept in priority order)
         if pool_hint:
-            filtered_tools = [
-                tool for tool in available_tools 
-                if tool['name'] in pool_hint
-            ]
-            if filtered_tools:
-                available_tools = filtered_tools
+            positions = self._tool_positions[capability]
+            hinted = sorted({positions[name] for name in pool_hint if name in positions})
+            if hinted:
+                available_tools = [available_tools[position] for position in hinted]
         
         # Filter by context use_case if provided
-        if context and 'use_case' in context:
-            use_case = context['use_case']
-            matching_tools = [
-                tool for tool in available_tools
-                if use_case in tool.get('use_cases', [])
-            ]
+        if use_case is not None:
+            if available_tools is self.tool_pools[capability]:
+                matching_tools = self._use_case_tools[capability].get(use_case)
+            else:
+                matching_tools = [
+                    tool for tool in available_tools
+                    if use_case in tool['use_cases']
+                ]
             if matching_tools:
                 available_tools = matching_tools
         
-        # Sort by priority (lower number = higher priority)
-        available_tools.sort(key=lambda x: x.get('priority', 999))
-        
-        # Select the highest priority tool
-        selected_tool = available_tools[0]
-        
-        # Resolve environment variables in config
-        resolved_config = self._resolve_config(selected_tool.get('config', {}))
+        # Select the highest priority tool (filters keep the pool's priority order)
+        return self._tool_info(available_tools[0])
+    
+    def _tool_info(self, tool: Mapping[str, Any]) -> Mapping[str, Any]:
+        """
+        Look up the selection result for a tool from the pool
         
+        Args:
+            tool: Tool entry from tool_pools
+            
+        Returns:
+            Shared, read-only tool information with its pre-resolved config
+        """
+        return self._tool_infos[id(tool)]
+    
+    def selection_cache_info(self) -> Dict[str, int]:
+        """Hit/miss counts and current size of the select() cache"""
         return {
-            'name': selected_tool['name'],
-            'config': resolved_config,
-            'priority': selected_tool.get('priority', 999),
-            'use_cases': selected_tool.get('use_cases', [])
+            'hits': self._selection_hits,
+            'misses': self._selection_misses,
+            'size': len(self._selection_cache)
         }
     
+    def clear_selection_cache(self):
+        """Drop cached selections, e.g. after tool pools or env vars change"""
+        self._selection_cache.clear()
+    
     def _resolve_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
         """
         Resolve environment variable references in config
         
+        Called once per tool at load; env vars are read at that point.
+        
         Args:
             config: Configuration dictionary with potential env var references
             
         Returns:
-            Configuration with resolved values
+            Configuration with resolved values (the config itself when it
+            has no env var references)
         """
+        if not any(isinstance(value, str) and key.endswith('_env') for key, value in config.items()):
+            return config
+        
         resolved = {}
         for key, value in config.items():
             if isinstance(value, str) and key.endswith('_env'):
@@ -159,7 +303,7 @@ Your current task: Select the best tool from the available pool based on the giv
                 resolved[key] = value
         return resolved
     
-    def get_fallback(self, capability: str, exclude: List[str]) -> Optional[Dict[str, Any]]:
+    def get_fallback(self, capability: str, exclude: List[str]) -> Optional[Mapping[str, Any]]:
         """
         Get a fallback tool for a capability, excluding specified tools
         
@@ -176,26 +320,11 @@ Your current task: Select the best tool from the available pool based on the giv
         if capability not in self.tool_pools:
             return None
         
-        available_tools = [
-            tool for tool in self.tool_pools[capability]
-            if tool['name'] not in exclude
-        ]
-        
-        if not available_tools:
-            return None
-        
-        # Sort by priority
-        available_tools.sort(key=lambda x: x.get('priority', 999))
-        
-        selected_tool = available_tools[0]
-        resolved_config = self._resolve_config(selected_tool.get('config', {}))
+        for tool in self.tool_pools[capability]:
+            if tool['name'] not in exclude:
+                return self._tool_info(tool)
         
-        return {
-            'name': selected_tool['name'],
-            'config': resolved_config,
-            'priority': selected_tool.get('priority', 999),
-            'use_cases': selected_tool.get('use_cases', [])
-        }
+        return None
     
     def list_capabilities(self) -> List[str]:
         """List all available capabilities"""
@@ -219,36 +348,20 @@ Your current task: Select the best tool from the available pool based on the giv
         Returns:
             Selected tool name: 'tesseract' or 'easyocr'
         """
-        tools = {
-            "tesseract": {
-                "description": "Fast, lightweight OCR. Best for high-quality printed text.",
-                "strengths": ["Speed", "Printed text", "English", "Low resource"],
-                "weaknesses": ["Handwriting", "Low quality", "Multi-language"]
-            },
-            "easyocr": {
-                "description": "Deep learning OCR. Better for handwriting and low quality.",
-                "strengths": ["Handwriting", "Low quality", "Multi-language"],
-                "weaknesses": ["Slower", "Higher resource usage"]
-            }
-        }
+        tools = self.OCR_TOOLS
         
         if not self.llm_client:
             return self._rule_based_ocr_selection(context, tools)
         
-        prompt = f"""Given: File Type: {context.get('file_type')}, Quality: {context.get('quality_hint')}, Handwriting: {context.get('has_handwriting')}
-
-Tools:
-1. Tesseract: {tools['tesseract']['description']}
-2. EasyOCR: {tools['easyocr']['description']}
-
-Select ONLY: "tesseract" or "easyocr" (prefer tesseract for standard invoices)"""
+        prompt = self._ocr_prompt(context)
+        
+        # The prompt is all the model sees, so equal prompts get the cached verdict
+        cached_tool = self._ocr_llm_cache.get(prompt)
+        if cached_tool is not None:
+            logger.info("LLM OCR pick (cached): context=%s result=%s", context, cached_tool)
+            return cached_tool
         
         try:
-            logger.info("=" * 60)
-            logger.info("LLM BIGTOOL PICKER - OCR Tool Selection")
-            logger.info("=" * 60)
-            logger.info(f"Context: {context}")
-            
             response = self.llm_client.chat.completions.create(
                 model="gpt-4o-mini",
                 messages=[
@@ -256,55 +369,180 @@ Select ONLY: "tesseract" or "easyocr" (prefer tesseract for standard invoices)""
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                max_tokens=50
+                max_tokens=self.OCR_MAX_TOKENS
             )
             
-            selected_tool = response.choices[0].message.content.strip().lower()
+            selected_tool = response.choices[0].message.content.strip().strip('"\'.').lower()
             if selected_tool not in ['tesseract', 'easyocr']:
                 selected_tool = 'tesseract'
             
-            logger.info(f"LLM Selected: {selected_tool}")
-            logger.info("=" * 60)
+            logger.info("LLM OCR pick: context=%s result=%s", context, selected_tool)
+            if len(self._ocr_llm_cache) >= SELECTION_CACHE_SIZE:
+                self._ocr_llm_cache.clear()
+            self._ocr_llm_cache[prompt] = selected_tool
             return selected_tool
             
         except Exception as e:
-            logger.error(f"LLM selection failed: {e}")
+            logger.error("LLM selection failed: %s", e)
             return self._rule_based_ocr_selection(context, tools)
     
+    def select_ocr_tool_batch(self, contexts: List[Dict[str, Any]]) -> List[str]:
+        """
+        Select OCR tools for many invoices, asking the LLM about up to
+        OCR_BATCH_SIZE distinct uncached contexts per request
+        
+        Args:
+            contexts: Context about each invoice/image
+        
+        Returns:
+            Selected tool names, in the same order as contexts
+        """
+        if not self.llm_client:
+            return [self._rule_based_ocr_selection(context, self.OCR_TOOLS) for context in contexts]
+        
+        prompts = [self._ocr_prompt(context) for context in contexts]
+        verdicts = {prompt: self._ocr_llm_cache.get(prompt) for prompt in prompts}
+        
+        # One representative context per distinct prompt still needing a verdict
+        pending = {}
+        for prompt, context in zip(prompts, contexts):
+            if verdicts[prompt] is None:
+                pending.setdefault(prompt, context)
+        pending_prompts = list(pending)
+        
+        for start in range(0, len(pending_prompts), self.OCR_BATCH_SIZE):
+            chunk = pending_prompts[start:start + self.OCR_BATCH_SIZE]
+            selected_tools = self._llm_ocr_batch([pending[prompt] for prompt in chunk])
+            if selected_tools is None:
+                # Fall back to one request per context
+                selected_tools = [self.select_ocr_tool(pending[prompt]) for prompt in chunk]
+            else:
+                for prompt, selected_tool in zip(chunk, selected_tools):
+                    if len(self._ocr_llm_cache) >= SELECTION_CACHE_SIZE:
+                        self._ocr_llm_cache.clear()
+                    self._ocr_llm_cache[prompt] = selected_tool
+            verdicts.update(zip(chunk, selected_tools))
+        
+        return [verdicts[prompt] for prompt in prompts]
+    
+    def _ocr_prompt(self, context: Dict[str, Any]) -> str:
+        """Build the single-invoice OCR selection prompt"""
+        tools = self.OCR_TOOLS
+        return f"""Given: File Type: {context.get('file_type')}, Quality: {context.get('quality_hint')}, Handwriting: {context.get('has_handwriting')}
+
+Tools:
+1. Tesseract: {tools['tesseract']['description']}
+2. EasyOCR: {tools['easyocr']['description']}
+
+Reply with ONLY the word "tesseract" or "easyocr" (prefer tesseract for standard invoices)"""
+    
+    def _llm_ocr_batch(self, contexts: List[Dict[str, Any]]) -> Optional[List[str]]:
+        """
+        Ask the LLM for the OCR tool of several invoices in one request
+        
+        Args:
+            contexts: Contexts to decide, at most OCR_BATCH_SIZE
+        
+        Returns:
+            Selected tool names in context order, or None if the request failed
+            or the reply could not be parsed
+        """
+        tools = self.OCR_TOOLS
+        invoices = "\n".join(
+            f"{number}. File Type: {context.get('file_type')}, Quality: {context.get('quality_hint')}, "
+            f"Handwriting: {context.get('has_handwriting')}"
+            for number, context in enumerate(contexts, 1)
+        )
+        prompt = f"""Given these invoices:
+{invoices}
+
+Tools:
+1. Tesseract: {tools['tesseract']['description']}
+2. EasyOCR: {tools['easyocr']['description']}
+
+For each invoice, in order, select ONLY "tesseract" or "easyocr" (prefer tesseract for standard invoices).
+Reply with a JSON array of {len(contexts)} strings and nothing else."""
+        
+        try:
+            logger.info("LLM BIGTOOL PICKER - OCR Tool Selection for %d invoices", len(contexts))
+            
+            response = self.llm_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": self.AGENT_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=10 * len(contexts) + 20
+            )
+            
+            content = response.choices[0].message.content.strip()
+            # Tolerate a fenced ```json reply
+            content = content.strip('`').strip()
+            if content.startswith('json'):
+                content = content[4:]
+            decisions = json.loads(content)
+        except Exception as e:
+            logger.error("LLM batch selection failed: %s", e)
+            return None
+        
+        if not isinstance(decisions, list) or len(decisions) != len(contexts):
+            logger.error("LLM batch selection returned %r, expected %d decisions", decisions, len(contexts))
+            return None
+        
+        selected_tools = []
+        for decision in decisions:
+            selected_tool = decision.strip().lower() if isinstance(decision, str) else ''
+            selected_tools.append(selected_tool if selected_tool in tools else 'tesseract')
+        return selected_tools
+    
     def _rule_based_ocr_selection(self, context: Dict[str, Any], tools: Dict) -> str:
         """Fallback rule-based OCR selection"""
-        if context.get('has_handwriting'):
-            return 'easyocr'
-        if context.get('quality_hint', '').lower() == 'low':
-            return 'easyocr'
-        if context.get('language', 'en') != 'en':
-            return 'easyocr'
-        return 'tesseract'
-    
-    def get_tool_info(self, tool_name: str, capability: str = 'ocr') -> Dict[str, Any]:
-        """Get detailed information about a selected tool"""
-        if capability == 'ocr':
-            if tool_name == 'tesseract':
-                return {
-                    'name': 'Tesseract OCR',
-                    'version': '5.x',
-                    'type': 'local',
-                    'capabilities': ['printed_text', 'english', 'fast'],
-                    'config': {'psm': 6, 'oem': 3}
-                }
-            elif tool_name == 'easyocr':
-                return {
-                    'name': 'EasyOCR',
-                    'version': 'latest',
-                    'type': 'deep_learning',
-                    'capabilities': ['handwriting', 'multi_language', 'low_quality'],
-                    'config': {'gpu': False, 'languages': ['en']}
-                }
-        return {'name': tool_name, 'type': 'unknown'}
+        return self.OCR_RULES[(
+            bool(context.get('has_handwriting')),
+            context.get('quality_hint', '').lower() == 'low',
+            context.get('language', 'en') != 'en'
+        )]
+    
+    def get_tool_info(self, tool_name: str, capability: str = 'ocr') -> Mapping[str, Any]:
+        """Get detailed information about a selected tool (read-only, shared)"""
+        info = self.TOOL_INFO.get((capability, tool_name))
+        if info is None:
+            return {'name': tool_name, 'type': 'unknown'}
+        return info
+
+
+# Singleton instance, created on first access (see get_picker)
+_instances: Dict[str, BigtoolPicker] = {}
+_instances_lock = threading.Lock()
 
 
-# Create singleton instance
-bigtool_picker = BigtoolPicker()
+def get_picker() -> BigtoolPicker:
+    """
+    Get the shared BigtoolPicker, creating it on first call
+    
+    Returns:
+        The singleton instance
+    """
+    with _instances_lock:
+        if 'bigtool_picker' not in _instances:
+            _instances['bigtool_picker'] = BigtoolPicker()
+        return _instances['bigtool_picker']
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Create the bigtool_picker singleton lazily
+    
+    Args:
+        name: Module attribute being looked up
+        
+    Returns:
+        The singleton instance
+    """
+    if name != 'bigtool_picker':
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return get_picker()
 
 
 if __name__ == "__main__":
@@ -312,7 +550,7 @@ if __name__ == "__main__":
     print("BigtoolPicker Test")
     print("=" * 60)
     
-    picker = BigtoolPicker()
+    picker = get_picker()
     
     print("\nAvailable capabilities:")
     for cap in picker.list_capabilities():
@@ -0,0 +1,95 @@
+"""
+Tests for integrations.tools.bigtool_picker
+"""
+import json
+import types
+import unittest
+
+from integrations.tools.bigtool_picker import BigtoolPicker
+
+
+CLEAN = {'file_type': 'pdf', 'quality_hint': 'high', 'has_handwriting': False}
+SCANNED = {'file_type': 'png', 'quality_hint': 'low', 'has_handwriting': True}
+PHOTO = {'file_type': 'jpg', 'quality_hint': 'medium', 'has_handwriting': False}
+
+
+class FakeCompletions:
+    """chat.completions double that replies with queued message contents"""
+    
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.prompts = []
+    
+    def create(self, model, messages, temperature, max_tokens):
+        self.prompts.append(messages[-1]['content'])
+        content = self.replies.pop(0)
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+class SelectOcrToolBatchTest(unittest.TestCase):
+    """select_ocr_tool_batch keeps context order and asks the LLM once per distinct context"""
+    
+    def setUp(self):
+        self.picker = BigtoolPicker()
+    
+    def _use_replies(self, *replies):
+        completions = FakeCompletions(replies)
+        self.picker._llm_client = types.SimpleNamespace(
+            chat=types.SimpleNamespace(completions=completions)
+        )
+        return completions
+    
+    def test_order_and_deduplication(self):
+        completions = self._use_replies(json.dumps(['easyocr', 'tesseract']))
+        
+        selected = self.picker.select_ocr_tool_batch([SCANNED, CLEAN, SCANNED])
+        
+        self.assertEqual(selected, ['easyocr', 'tesseract', 'easyocr'])
+        self.assertEqual(len(completions.prompts), 1)
+        self.assertIn('1. File Type: png', completions.prompts[0])
+        self.assertIn('2. File Type: pdf', completions.prompts[0])
+        self.assertNotIn('3. File Type', completions.prompts[0])
+    
+    def test_cache_hits_skip_the_llm(self):
+        completions = self._use_replies(json.dumps(['easyocr']), json.dumps(['tesseract']))
+        self.picker.select_ocr_tool_batch([SCANNED])
+        
+        selected = self.picker.select_ocr_tool_batch([CLEAN, SCANNED])
+        
+        self.assertEqual(selected, ['tesseract', 'easyocr'])
+        self.assertEqual(len(completions.prompts), 2)
+        # Only the uncached context was sent the second time
+        self.assertIn('1. File Type: pdf', completions.prompts[1])
+        self.assertNotIn('2. File Type', completions.prompts[1])
+        
+        # Verdicts are shared with single-invoice selection
+        self.assertEqual(self.picker.select_ocr_tool(CLEAN), 'tesseract')
+        self.assertEqual(len(completions.prompts), 2)
+    
+    def test_unparseable_reply_falls_back_to_single_requests(self):
+        completions = self._use_replies('not json', 'easyocr', '"tesseract"')
+        
+        selected = self.picker.select_ocr_tool_batch([SCANNED, PHOTO])
+        
+        self.assertEqual(selected, ['easyocr', 'tesseract'])
+        self.assertEqual(len(completions.prompts), 3)
+    
+    def test_unknown_tool_defaults_to_tesseract(self):
+        self._use_replies(json.dumps(['EasyOCR', 'abbyy']))
+        
+        self.assertEqual(self.picker.select_ocr_tool_batch([SCANNED, PHOTO]), ['easyocr', 'tesseract'])
+    
+    def test_rules_without_client(self):
+        self.picker._llm_client = None
+        self.picker.api_key = None
+        
+        self.assertEqual(
+            self.picker.select_ocr_tool_batch([SCANNED, CLEAN]),
+            ['easyocr', 'tesseract']
+        )
+        self.assertEqual(self.picker.select_ocr_tool_batch([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
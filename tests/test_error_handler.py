@@ -0,0 +1,91 @@
+"""
+Tests for core.utils.error_handler
+"""
+import types
+import unittest
+from unittest import mock
+
+from core.utils import error_handler as error_handler_module
+from core.utils.error_handler import ErrorHandler, InvoiceProcessingError
+
+
+class FakeSession:
+    """Session double that rejects multi-row inserts and rows for 'bad' invoices"""
+    
+    def __init__(self, committed):
+        self.committed = committed
+        self._staged = []
+    
+    def bulk_insert_mappings(self, model, rows):
+        if len(rows) > 1 or any(row['invoice_id'] == 'bad' for row in rows):
+            raise RuntimeError("insert failed")
+        self._staged.extend(rows)
+    
+    def commit(self):
+        self.committed.extend(self._staged)
+        self._staged = []
+    
+    def rollback(self):
+        self._staged = []
+    
+    def close(self):
+        pass
+
+
+class AuditLogFlushTest(unittest.TestCase):
+    """Queued failed-state audit rows are written, retried singly, or counted as dropped"""
+    
+    def setUp(self):
+        self.committed = []
+        fake_database = types.ModuleType('core.models.database')
+        fake_database.AuditLog = object
+        fake_database.get_session = lambda: FakeSession(self.committed)
+        patcher = mock.patch.dict('sys.modules', {'core.models.database': fake_database})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        self.handler = ErrorHandler(notify_ops_team=False)
+        # Keep the background flusher out of the way; the tests flush explicitly
+        self.handler._audit_flush_interval = 3600
+    
+    def _fail(self, invoice_id):
+        error = InvoiceProcessingError("boom", node='post', recoverable=False)
+        return self.handler.handle_error(error, 'post', state={'invoice_id': invoice_id})
+    
+    def test_batch_failure_falls_back_to_single_rows(self):
+        infos = [self._fail('INV-1'), self._fail('bad'), self._fail('INV-2')]
+        self.assertEqual([info['state_persisted'] for info in infos], [False] * 3)
+        self.assertTrue(all(info['state_queued'] for info in infos))
+        
+        self.handler.flush_audit_log()
+        
+        self.assertEqual([row['invoice_id'] for row in self.committed], ['INV-1', 'INV-2'])
+        self.assertEqual([info['state_persisted'] for info in infos], [True, False, True])
+        self.assertEqual(self.handler.get_error_summary()['audit_records_dropped'], 1)
+        self.assertEqual(self.handler._pending_audit, [])
+    
+    def test_single_row_batch_commits(self):
+        info = self._fail('INV-1')
+        self.handler.flush_audit_log()
+        
+        self.assertTrue(info['state_persisted'])
+        self.assertEqual(len(self.committed), 1)
+        self.assertEqual(self.handler.get_error_summary()['audit_records_dropped'], 0)
+    
+    def test_exit_flush_drains_queue(self):
+        self._fail('INV-1')
+        self._fail('INV-2')
+        self.assertIn(self.handler, error_handler_module._audit_handlers)
+        
+        error_handler_module._flush_audit_logs_at_exit()
+        
+        self.assertEqual(self.handler._pending_audit, [])
+        self.assertEqual(len(self.committed), 2)
+        
+        # A second flush has nothing left to write
+        error_handler_module._flush_audit_logs_at_exit()
+        self.assertEqual(len(self.committed), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
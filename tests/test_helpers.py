@@ -0,0 +1,83 @@
+"""
+Tests for core.utils.helpers
+"""
+import hashlib
+import json
+import unittest
+
+from core.utils.helpers import (
+    calculate_hash,
+    format_currency,
+    is_within_tolerance,
+    _format_currency
+)
+
+
+def baseline_hash(data):
+    """Digest as originally defined: SHA-256 of the sorted-key JSON"""
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class FormatCurrencyTest(unittest.TestCase):
+    """format_currency output must not depend on what is already cached"""
+    
+    def setUp(self):
+        _format_currency.cache_clear()
+    
+    def test_negative_zero_after_zero(self):
+        self.assertEqual(format_currency(0.0), "$0.00")
+        self.assertEqual(format_currency(-0.001), "$0.00")
+    
+    def test_zero_after_negative_zero(self):
+        self.assertEqual(format_currency(-0.001), "$0.00")
+        self.assertEqual(format_currency(0.0), "$0.00")
+    
+    def test_formats(self):
+        self.assertEqual(format_currency(1234.5), "$1,234.50")
+        self.assertEqual(format_currency(-12.345, "EUR"), "-12.35 EUR")
+        self.assertEqual(format_currency(1234.5, "GBP"), "1,234.50 GBP")
+        self.assertEqual(format_currency(10, "CHF"), "10.00 CHF")
+
+
+class IsWithinToleranceTest(unittest.TestCase):
+    """Values exactly on the tolerance boundary count as within tolerance"""
+    
+    def test_upper_boundary(self):
+        self.assertTrue(is_within_tolerance(1.1, 1.0, 10))
+        self.assertTrue(is_within_tolerance(2.2, 2.0, 10))
+        self.assertTrue(is_within_tolerance(110.0, 100.0, 10))
+    
+    def test_lower_boundary(self):
+        self.assertTrue(is_within_tolerance(0.9, 1.0, 10))
+        self.assertTrue(is_within_tolerance(90.0, 100.0, 10))
+    
+    def test_outside(self):
+        self.assertFalse(is_within_tolerance(1.11, 1.0, 10))
+        self.assertFalse(is_within_tolerance(0.89, 1.0, 10))
+
+
+class CalculateHashTest(unittest.TestCase):
+    """Stored payload hashes must keep matching the original digests"""
+    
+    def test_matches_original_digests(self):
+        for data in (
+            "INV-001",
+            b"raw bytes",
+            {'b': [1, 2.5, None], 'a': {'z': 'é', 'y': True}},
+            {},
+            {1: 'non-str key'},
+            [3, 'x'],
+            42
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(calculate_hash(data), baseline_hash(data))
+    
+    def test_str_is_hashed_as_json(self):
+        self.assertEqual(
+            calculate_hash("abc"),
+            hashlib.sha256(b'"abc"').hexdigest()
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
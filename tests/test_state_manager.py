@@ -0,0 +1,57 @@
+"""
+Tests for core.utils.state_manager
+"""
+import tempfile
+import unittest
+
+from core.utils.state_manager import StateSnapshot
+
+
+class StateSnapshotTest(unittest.TestCase):
+    """Disk and memory snapshot stores behave the same for any snapshot ID"""
+    
+    IDS = ('a/b', 'a_b', 'INV-001:ocr', 'Résumé', 'A', 'a')
+    
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.stores = {
+            'memory': StateSnapshot(),
+            'disk': StateSnapshot(storage_dir=tmp_dir.name)
+        }
+    
+    def test_round_trip(self):
+        for mode, store in self.stores.items():
+            with self.subTest(mode=mode):
+                for snapshot_id in self.IDS:
+                    store.save_snapshot(snapshot_id, {'invoice_id': snapshot_id})
+                
+                self.assertEqual(sorted(store.list_snapshots()), sorted(self.IDS))
+                for snapshot_id in self.IDS:
+                    self.assertEqual(store.load_snapshot(snapshot_id), {'invoice_id': snapshot_id})
+                
+                store.delete_snapshot('a/b')
+                self.assertIsNone(store.load_snapshot('a/b'))
+                self.assertEqual(store.load_snapshot('a_b'), {'invoice_id': 'a_b'})
+                self.assertNotIn('a/b', store.list_snapshots())
+                
+                # Deleting a missing snapshot is a no-op
+                store.delete_snapshot('a/b')
+    
+    def test_snapshot_is_isolated_from_state(self):
+        for mode, store in self.stores.items():
+            with self.subTest(mode=mode):
+                state = {'line_items': [1]}
+                store.save_snapshot('s', state)
+                state['line_items'].append(2)
+                self.assertEqual(store.load_snapshot('s'), {'line_items': [1]})
+    
+    def test_missing_snapshot(self):
+        for mode, store in self.stores.items():
+            with self.subTest(mode=mode):
+                self.assertIsNone(store.load_snapshot('nope'))
+                self.assertEqual(store.list_snapshots(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()